@@ -0,0 +1,88 @@
+import os
+import re
+import hashlib
+import tempfile
+
+# Content-addressed store for uploaded images.
+# Files are named by the SHA-256 of their bytes, so the same photo sent
+# again (e.g. on every regenerate) is stored once and keeps the same ID.
+ASSET_DIR = os.path.join("temp_uploads", "assets")
+os.makedirs(ASSET_DIR, exist_ok=True)
+
+_ASSET_ID_RE = re.compile(r'^[0-9a-f]{64}$')
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def is_asset_id(value):
+    """True if value looks like an asset ID (sha256 hex digest)."""
+    return isinstance(value, str) and bool(_ASSET_ID_RE.match(value))
+
+
+def asset_path(asset_id):
+    return os.path.join(ASSET_DIR, asset_id)
+
+
+def has_asset(asset_id):
+    return is_asset_id(asset_id) and os.path.exists(asset_path(asset_id))
+
+
+def touch_asset(asset_id):
+    # Refreshes the mtime so the scratch sweeper's TTL counts from last use
+    try:
+        os.utime(asset_path(asset_id))
+    except FileNotFoundError:
+        pass
+
+
+def get_asset_path(asset_id):
+    """Returns the local path of a stored asset, or None if it is unknown."""
+    if has_asset(asset_id):
+        touch_asset(asset_id)
+        return asset_path(asset_id)
+    return None
+
+
+def _commit(tmp_path, asset_id):
+    final_path = asset_path(asset_id)
+    if os.path.exists(final_path):
+        # Identical bytes already stored, drop the duplicate
+        os.remove(tmp_path)
+        touch_asset(asset_id)
+    else:
+        os.replace(tmp_path, final_path)
+    return asset_id
+
+
+def save_asset(data):
+    """Stores raw bytes and returns their asset ID. Skips the write if already stored."""
+    asset_id = hashlib.sha256(data).hexdigest()
+    if has_asset(asset_id):
+        touch_asset(asset_id)
+        return asset_id
+
+    fd, tmp_path = tempfile.mkstemp(dir=ASSET_DIR, prefix=".tmp_")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    return _commit(tmp_path, asset_id)
+
+
+def save_asset_stream(fileobj):
+    """
+    Stores a file-like object chunk by chunk, hashing while writing,
+    so large uploads are never held in memory. Returns the asset ID.
+    """
+    hasher = hashlib.sha256()
+    fd, tmp_path = tempfile.mkstemp(dir=ASSET_DIR, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                f.write(chunk)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return _commit(tmp_path, hasher.hexdigest())
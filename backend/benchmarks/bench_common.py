@@ -0,0 +1,39 @@
+"""
+Helpers shared by the benchmark scripts: timing, percentiles and the JSON report.
+
+The scripts are run as `python benchmarks/bench_x.py`, so this directory is on
+sys.path and they import it as `bench_common`.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    k = min(len(values) - 1, max(0, int(round(pct / 100.0 * (len(values) - 1)))))
+    return values[k]
+
+
+@contextmanager
+def timed(latencies):
+    """Appends the wall time of the block, in ms, to latencies."""
+    start = time.perf_counter()
+    yield
+    latencies.append((time.perf_counter() - start) * 1000)
+
+
+def summarize(latencies, pcts=(50, 95)):
+    """{"p50_ms": .., "p95_ms": .., "mean_ms": ..} of a list of ms values."""
+    summary = {f"p{pct}_ms": round(percentile(latencies, pct), 2) for pct in pcts}
+    summary["mean_ms"] = round(sum(latencies) / len(latencies), 2)
+    return summary
+
+
+def print_report(report, output=None):
+    """Prints the report as JSON on stdout and, with output, also writes it there."""
+    text = json.dumps(report, indent=2)
+    print(text)
+    if output:
+        with open(output, "w") as f:
+            f.write(text)
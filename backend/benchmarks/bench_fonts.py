@@ -0,0 +1,78 @@
+"""
+Small-report latency with per-request font loading vs. the process-wide font registry.
+
+    cd backend
+    FONT_DIR=/path/to/fonts python benchmarks/bench_fonts.py --reports 30
+
+Prints JSON: {"per_request": {...}, "registry": {...}} with p50/p95/mean in ms for
+one report (1 unit without photos + summary page). Needs Calibri or Carlito files
+in FONT_DIR (or a system font directory), otherwise reports skipped.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_generator import MultiSetPDF, resolve_layout, render_unit, render_summary
+from font_registry import FontRegistry
+from bench_common import timed, summarize, print_report
+
+
+def small_report(pdf, main_font, layout):
+    unit = {"nopol": "B 1234 XYZ", "bu": "BU JAKARTA", "lokasi": "CAKUNG", "images": {}}
+    row = render_unit(pdf, main_font, unit, {}, layout)
+    render_summary(pdf, main_font, [row])
+    return bytes(pdf.output())
+
+
+def per_request_fonts(paths):
+    # What every report used to do: parse the three TTFs again
+    pdf = MultiSetPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    for style, path in paths.items():
+        pdf.add_font("Calibri", style, path)
+    return pdf, "Calibri"
+
+
+def registry_fonts(registry):
+    pdf = MultiSetPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf, registry.install(pdf)
+
+
+def measure(make_pdf, layout, reports):
+    latencies = []
+    for _ in range(reports):
+        with timed(latencies):
+            pdf, main_font = make_pdf()
+            small_report(pdf, main_font, layout)
+    return {"reports": reports, **summarize(latencies)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=30)
+    args = parser.parse_args()
+
+    registry = FontRegistry()
+    start = time.perf_counter()
+    registry.templates()
+    load_ms = (time.perf_counter() - start) * 1000
+    if not registry.paths:
+        print_report({"skipped": "no Calibri/Carlito font found, set FONT_DIR"})
+        return
+
+    layout, _ = resolve_layout()
+    report = {
+        "font_dir": os.path.dirname(registry.paths[""]),
+        "registry_first_load_ms": round(load_ms, 2),
+        "per_request": measure(lambda: per_request_fonts(registry.paths), layout, args.reports),
+        "registry": measure(lambda: registry_fonts(registry), layout, args.reports),
+    }
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Per-image latency of the smart-crop detector on each CPU inference backend.
+
+    cd backend
+    python benchmarks/bench_inference.py --images 20 --threads 4
+
+Prints JSON: {backend: {"p50_ms", "p95_ms", "mean_ms", "batch8_per_image_ms"}}.
+Backends that can't be loaded (missing onnxruntime/openvino) are reported as skipped.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from inference import load_yolo, BACKENDS
+from bench_common import timed, summarize, print_report
+
+
+def synthetic_photo(seed, width=1600, height=1200):
+    # Phone-sized image with a bright rectangle so the model has something to chew on
+    rng = np.random.default_rng(seed)
+    img = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    img[height // 4: 3 * height // 4, width // 5: 4 * width // 5] = (200, 200, 210)
+    return img
+
+
+def bench_backend(model_path, backend, images, threads):
+    model, used = load_yolo(model_path, backend, threads, warmup_image=images[0])
+    if used != backend:
+        return {"skipped": f"{backend} not available, fell back to {used}"}
+
+    latencies = []
+    for img in images:
+        with timed(latencies):
+            model(img, verbose=False)
+
+    batch = images[:8]
+    start = time.perf_counter()
+    model(batch, verbose=False)
+    batch_ms = (time.perf_counter() - start) * 1000 / len(batch)
+
+    return {
+        "images": len(images),
+        **summarize(latencies),
+        "batch8_per_image_ms": round(batch_ms, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=os.environ.get("YOLO_MODEL", "yolov8n.pt"))
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    args = parser.parse_args()
+
+    images = [synthetic_photo(i) for i in range(max(8, args.images))]
+    report = {}
+    for backend in args.backends.split(","):
+        try:
+            report[backend] = bench_backend(args.model, backend, images, args.threads)
+        except Exception as e:
+            report[backend] = {"error": str(e)}
+
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Benchmark suite for the crop, fetch and render hot paths.
+
+    cd backend
+    python benchmarks/bench_suite.py                       # 1/10/100/1000 units, all ops
+    python benchmarks/bench_suite.py --units 1,10 --ops create_multiset_pdf,create_multiset_docx
+    python benchmarks/bench_suite.py --output bench.json --drive-latency-ms 30
+
+Every (op, units) case runs in a fresh process, so peak RSS belongs to that case
+only. Images are synthetic phone-sized JPEGs (a document on a noisy background),
+served by a local stand-in Drive server (stub_drive) and fetched through the
+normal Drive code path. Caches are cleared before every timed call / report.
+
+Prints JSON: {"config": {...}, "results": [{"op", "units", "samples", "p50_ms",
+"p95_ms", "p99_ms", "mean_ms", "max_ms", "per_unit_ms", "output_bytes",
+"baseline_rss_mb", "peak_rss_mb"}, ...]}.
+
+Per-image ops (ai_smart_crop, smart_doc_crop, fetch_drive_image,
+fit_and_center_image) take one sample per unit, up to --max-samples.
+Report ops (create_multiset_pdf/docx) render the whole batch --repeat times;
+each unit has all 8 photos, drawn from a pool of --distinct-images images.
+"""
+import os
+import sys
+import io
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from bench_common import timed, summarize, print_report
+
+OPS = [
+    "ai_smart_crop",
+    "smart_doc_crop",
+    "fetch_drive_image",
+    "fit_and_center_image",
+    "create_multiset_pdf",
+    "create_multiset_docx",
+]
+IMAGE_KEYS = ["stnk", "tax", "kir", "kir_card", "front", "back", "right", "left"]
+
+
+def synthetic_phone_jpeg(seed, width, height, quality=90):
+    """A document (light, slightly rotated, with text lines) photographed on a noisy table."""
+    import cv2
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    img = rng.integers(40, 110, (height, width, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(img, (5, 5), 0)
+
+    cx, cy = width / 2, height / 2
+    w, h = width * 0.62, height * 0.5
+    angle = np.deg2rad(rng.uniform(-8, 8))
+    corners = np.array([[-w / 2, -h / 2], [w / 2, -h / 2], [w / 2, h / 2], [-w / 2, h / 2]])
+    rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    pts = (corners @ rot.T + [cx, cy]).astype(np.int32)
+    cv2.fillPoly(img, [pts], (225, 228, 232))
+
+    for line in range(8):
+        y = int(cy - h / 2 + h * (line + 1) / 10)
+        cv2.putText(img, f"NOMOR {seed:04d} LINE {line}", (int(cx - w / 3), y),
+                    cv2.FONT_HERSHEY_SIMPLEX, width / 1600, (30, 30, 30), 2)
+
+    ok, encoded = cv2.imencode(".jpg", img, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return encoded.tobytes()
+
+
+def rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def drive_url(unit, key):
+    return f"https://drive.google.com/file/d/u{unit}_{key}/view"
+
+
+def run_case(op, units, config):
+    """Worker process: sets up images + stub Drive, times one op, returns its result row."""
+    # The app logs with print(); keep stdout for the JSON report
+    sys.stdout = sys.stderr
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    # Keep the benchmark's caches out of the real temp_uploads
+    os.environ["DRIVE_CACHE_DIR"] = os.path.join(work_dir, "drive_cache")
+    os.environ["DOC_CROP_CACHE_DIR"] = os.path.join(work_dir, "doc_crop_cache")
+    os.chdir(BACKEND_DIR)
+
+    import pdf_generator
+    import smart_crop
+    from stub_drive import StubDriveServer
+
+    pool = [
+        synthetic_phone_jpeg(i, config["width"], config["height"])
+        for i in range(min(config["distinct_images"], max(units, 1) * len(IMAGE_KEYS)))
+    ]
+    pool_paths = []
+    for i, data in enumerate(pool):
+        path = os.path.join(work_dir, f"photo_{i}.jpg")
+        with open(path, "wb") as f:
+            f.write(data)
+        pool_paths.append(path)
+
+    server = StubDriveServer(response_delay=config["drive_latency_ms"] / 1000.0, image=pool[0]).start()
+    pdf_generator.DRIVE_BASE_URL = server.url
+    report_units = []
+    n = 0
+    for u in range(units):
+        images = {}
+        for key in IMAGE_KEYS:
+            server.add_image(f"u{u}_{key}", pool[n % len(pool)])
+            images[key] = drive_url(u, key)
+            n += 1
+        report_units.append({"nopol": f"B {u:04d} BEN", "bu": "BENCH", "lokasi": "LAB", "images": images})
+
+    def clear_caches():
+        pdf_generator.drive_cache.clear()
+        smart_crop.doc_crop_cache.clear()
+
+    baseline_rss = rss_mb()
+    latencies = []
+    output_bytes = None
+    samples = min(units, config["max_samples"])
+
+    try:
+        if op == "ai_smart_crop":
+            import main
+            main.load_model()
+            for i in range(samples):
+                data = pool[i % len(pool)]
+                with timed(latencies):
+                    main.ai_smart_crop(data)
+
+        elif op == "smart_doc_crop":
+            for i in range(samples):
+                clear_caches()
+                source = io.BytesIO(pool[i % len(pool)])
+                with timed(latencies):
+                    smart_crop.smart_doc_crop(source)
+
+        elif op == "fetch_drive_image":
+            for i in range(samples):
+                clear_caches()
+                with timed(latencies):
+                    result = pdf_generator.fetch_drive_image(drive_url(i, "front"))
+                if result is None:
+                    raise RuntimeError("stub Drive fetch failed")
+
+        elif op == "fit_and_center_image":
+            pdf, _ = pdf_generator.new_multiset_pdf()
+            pdf.add_page()
+            for i in range(samples):
+                with timed(latencies):
+                    with open(pool_paths[i % len(pool_paths)], "rb") as f:
+                        source = io.BytesIO(f.read())
+                    pdf_generator.fit_and_center_image(pdf, source, 10, 50, 90, 80)
+
+        elif op == "create_multiset_pdf":
+            output = os.path.join(work_dir, "report.pdf")
+            for _ in range(config["repeat"]):
+                clear_caches()
+                with timed(latencies):
+                    pdf_generator.create_multiset_pdf(report_units, output)
+            output_bytes = os.path.getsize(output)
+
+        elif op == "create_multiset_docx":
+            from docx_generator import create_multiset_docx
+
+            output = os.path.join(work_dir, "report.docx")
+            for _ in range(config["repeat"]):
+                clear_caches()
+                with timed(latencies):
+                    create_multiset_docx({"units": report_units}, output)
+            output_bytes = os.path.getsize(output)
+
+        else:
+            raise ValueError(f"unknown op {op}")
+    finally:
+        server.stop()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    per_report = op.startswith("create_")
+    return {
+        "op": op,
+        "units": units,
+        "samples": len(latencies),
+        **summarize(latencies, (50, 95, 99)),
+        "max_ms": round(max(latencies), 2),
+        "per_unit_ms": round(sum(latencies) / len(latencies) / units, 2) if per_report else None,
+        "output_bytes": output_bytes,
+        "baseline_rss_mb": baseline_rss,
+        "peak_rss_mb": rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--units", default="1,10,100,1000")
+    parser.add_argument("--ops", default=",".join(OPS))
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per report case")
+    parser.add_argument("--max-samples", type=int, default=100, help="cap for per-image ops")
+    parser.add_argument("--distinct-images", type=int, default=16)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--drive-latency-ms", type=float, default=0.0)
+    parser.add_argument("--output", help="also write the JSON to this file")
+    args = parser.parse_args()
+
+    config = {
+        "repeat": args.repeat,
+        "max_samples": args.max_samples,
+        "distinct_images": args.distinct_images,
+        "width": args.width,
+        "height": args.height,
+        "drive_latency_ms": args.drive_latency_ms,
+        "cpus": os.cpu_count(),
+        "python": sys.version.split()[0],
+    }
+
+    results = []
+    ctx = multiprocessing.get_context("spawn")
+    for op in args.ops.split(","):
+        for units in (int(u) for u in args.units.split(",")):
+            print(f"INFO: {op} x {units} units...", file=sys.stderr)
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+                try:
+                    results.append(executor.submit(run_case, op, units, config).result())
+                except Exception as e:
+                    results.append({"op": op, "units": units, "error": str(e)})
+
+    print_report({"config": config, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    main()
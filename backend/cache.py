@@ -0,0 +1,175 @@
+import os
+import time
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class MemoryLRU:
+    """
+    In-memory LRU for bytes values, bounded by total byte size
+    instead of item count (images vary a lot in size).
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            # Would evict everything else, not worth keeping in memory
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= len(old)
+            self._items[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    """
+    On-disk bytes store with a TTL (by write time) and a total size budget.
+    When over budget the oldest entries are removed first.
+    """
+    def __init__(self, directory, max_bytes, ttl_seconds):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.current_bytes = sum(size for _, size, _ in self._entries())
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith(".tmp_"):
+                st = entry.stat()
+                entries.append((entry.path, st.st_size, st.st_mtime))
+        return entries
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            self.current_bytes -= size
+        except OSError:
+            pass
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        if self.ttl_seconds and time.time() - mtime > self.ttl_seconds:
+            with self._lock:
+                self._remove(path)
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp_")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+
+        with self._lock:
+            if os.path.exists(path):
+                self._remove(path)
+            os.replace(tmp_path, path)
+            self.current_bytes += len(value)
+            if self.current_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        now = time.time()
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        for path, _, mtime in entries:
+            if self.current_bytes <= self.max_bytes and not (self.ttl_seconds and now - mtime > self.ttl_seconds):
+                break
+            self._remove(path)
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._entries():
+                self._remove(path)
+            self.current_bytes = 0
+
+
+class TieredCache:
+    """
+    Memory LRU in front of a disk store. Disk hits are promoted to memory.
+    Keeps hit/miss counters for monitoring.
+    """
+    def __init__(self, memory, disk):
+        self.memory = memory
+        self.disk = disk
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        value = self.disk.get(key)
+        if value is not None:
+            self.disk_hits += 1
+            self.memory.put(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        self.disk.put(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_items": len(self.memory),
+            "memory_bytes": self.memory.current_bytes,
+            "disk_bytes": self.disk.current_bytes,
+        }
@@ -4,55 +4,31 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.enum.table import WD_TABLE_ALIGNMENT
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
-import requests
+from docx.oxml.shape import CT_Inline
 from io import BytesIO
+from copy import deepcopy
+import itertools
+import hashlib
+import time
 import os
-from pdf_generator import fetch_drive_image
+from image_sources import resolver
+from image_resample import downsample_to_box
+import metrics
+
+# Pictures are resampled to their displayed width (max_width_mm) at this DPI and
+# re-encoded as JPEG; Word would otherwise store the full-resolution original.
+# DOCX_IMAGE_DPI=0 keeps the original bytes.
+DOCX_IMAGE_DPI = int(os.environ.get("DOCX_IMAGE_DPI", "200"))
+DOCX_JPEG_QUALITY = int(os.environ.get("DOCX_JPEG_QUALITY", "85"))
 
 def fetch_image(path_or_url):
     """
-    Fetches an image from a local path or URL and returns a BytesIO object.
+    Fetches an image from any image_sources reference (Drive/HTTP URL, data URL,
+    asset ID, local://<name>/<path> in a directory configured in IMAGE_SOURCE_DIRS)
+    and returns a BytesIO object.
     Returns None if the image cannot be loaded.
     """
-    if not path_or_url:
-        return None
-
-    try:
-        # Check if it's a URL
-        if path_or_url.startswith('http'):
-            # Use the robust Drive fetcher from pdf_generator if it's a drive link or general url
-            # The fetch_drive_image function handles generic URLs too if they aren't drive (conceptually, looking at it, it explicitly checks drive patterns, but let's verify)
-            # Actually pdf_generator.fetch_drive_image returns None if not drive.
-            # So we should check.
-            
-            if 'drive.google.com' in path_or_url:
-                return fetch_drive_image(path_or_url)
-            
-            # Disable SSL verify for internal consistency with pdf_generator
-            response = requests.get(path_or_url, verify=False, timeout=10)
-            if response.status_code == 200:
-                return BytesIO(response.content)
-            else:
-                return None
-        
-        # Check if it's a base64 string (data URI)
-        elif path_or_url.startswith('data:image'):
-            # Base64 handling
-            from base64 import b64decode
-            header, encoded = path_or_url.split(",", 1)
-            data = b64decode(encoded)
-            return BytesIO(data)
-
-        # Local file path
-        elif os.path.exists(path_or_url):
-             with open(path_or_url, 'rb') as f:
-                return BytesIO(f.read())
-        
-        return None
-
-    except Exception as e:
-        print(f"Error fetching image {path_or_url}: {e}")
-        return None
+    return resolver.fetch(path_or_url)
 
 def set_cell_margins(cell, top=0, start=0, bottom=0, end=0):
     """
@@ -73,7 +49,122 @@ def set_cell_margins(cell, top=0, start=0, bottom=0, end=0):
     
     tcPr.append(tcMar)
 
-def create_multiset_docx(data, output_path):
+# Unit page template: placeholders replaced per unit
+HEADER_MARKER = "{{header}}"
+SLOT_MARKER = "{{img:"
+
+# Image slots in fill order, with the displayed picture width
+SLOT_WIDTHS_MM = {
+    'stnk': 160,
+    'tax': 160,
+    'kir': 85,
+    'kir_card': 85,
+    'front': 85,
+    'back': 85,
+    'right': 85,
+    'left': 85,
+}
+SLOT_ORDER = list(SLOT_WIDTHS_MM)
+
+def _insert_before_sectpr(body, element):
+    sect_pr = body.sectPr
+    if sect_pr is not None:
+        sect_pr.addprevious(element)
+    else:
+        body.append(element)
+
+def _max_shape_id(doc):
+    ids = [int(i) for i in doc.element.xpath('//@id') if i.isdigit()]
+    return max(ids) if ids else 0
+
+def build_unit_template(doc):
+    """
+    Builds the two pages of one unit (documents + physical photos) in `doc` with
+    marker text instead of the unit's data, then takes them out of the body.
+    Returns the XML elements, to be deep-copied and filled for every unit.
+    """
+    body = doc.element.body
+    existing = set(id(el) for el in body)
+
+    def add_header():
+        # Header - Matches PDF: "BU : {bu} - {location} - {nopol}"
+        p = doc.add_paragraph()
+        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
+        run = p.add_run(HEADER_MARKER)
+        run.bold = True
+        run.font.size = Pt(11) # PDF uses 11
+
+        # Space after header
+        doc.add_paragraph()
+
+    def slot_cell(cell, title, img_key):
+        p = cell.paragraphs[0]
+        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
+        # The marker after the line break is where the picture or "[...]" text goes
+        run = p.add_run(title + "\n" + SLOT_MARKER + img_key + "}}")
+        run.bold = True
+
+    # --- PAGE 1: Check Fisik Dokumen ---
+    add_header()
+
+    # Table for Documents (STNK, Pajak, KIR)
+    # Layout:
+    # Row 1: STNK (Full Width)
+    # Row 2: Pajak (Full Width)
+    # Row 3: KIR Kertas (Left), KIR Kartu (Right)
+    table = doc.add_table(rows=3, cols=2)
+    table.style = 'Table Grid'
+    table.autofit = False
+
+    # Set column widths (Total 190mm)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.width = Mm(95)
+
+    # Row 1: STNK (Merge cells)
+    cell_stnk = table.cell(0, 0)
+    cell_stnk.merge(table.cell(0, 1))
+    slot_cell(cell_stnk, "FOTO STNK (SURAT TANDA NOMOR KENDARAAN) :", 'stnk')
+
+    # Row 2: Pajak (Merge cells)
+    cell_pajak = table.cell(1, 0)
+    cell_pajak.merge(table.cell(1, 1))
+    slot_cell(cell_pajak, "FOTO LEMBAR PAJAK :", 'tax')
+
+    # Row 3: KIR (Split)
+    slot_cell(table.cell(2, 0), "FOTO LEMBAR KIR :", 'kir')
+    slot_cell(table.cell(2, 1), "FOTO KARTU KIR :", 'kir_card')
+
+    doc.add_page_break()
+
+    # --- PAGE 2: Foto Fisik Kendaraan ---
+    add_header()
+
+    # Table for Physical Photos
+    # Row 1: Depan, Belakang
+    # Row 2: Kanan, Kiri
+    table_phys = doc.add_table(rows=2, cols=2)
+    table_phys.style = 'Table Grid'
+
+    slot_cell(table_phys.cell(0, 0), "TAMPAK DEPAN", 'front')
+    slot_cell(table_phys.cell(0, 1), "TAMPAK BELAKANG", 'back')
+    slot_cell(table_phys.cell(1, 0), "TAMPAK SAMPING KANAN", 'right')
+    slot_cell(table_phys.cell(1, 1), "TAMPAK SAMPING KIRI", 'left')
+
+    doc.add_page_break()
+
+    template = [el for el in body if id(el) not in existing and el.tag != qn('w:sectPr')]
+    for el in template:
+        body.remove(el)
+    return template
+
+def create_multiset_docx(data, output_path, progress=None):
+    """
+    Renders the multi-unit asset report as DOCX to output_path.
+    progress(stage, unit_index, image_key=None) is called per image for "fetch"
+    and per unit for "render"; raising from it aborts the render.
+    """
+    start = time.perf_counter()
     doc = Document()
     
     # Set Narrow Margins (1.27 cm)
@@ -94,119 +185,90 @@ def create_multiset_docx(data, output_path):
     units = data.get('units', [])
     layout_config = data.get('layout', {}) 
 
+    image_bytes = {"original": 0, "embedded": 0}
+
+    # The two unit pages are built once with python-docx and then cloned per unit
+    template = build_unit_template(doc)
+    body = doc.element.body
+    shape_ids = itertools.count(_max_shape_id(doc) + 1)
+    image_rids = {}
+
+    def add_picture(run, img_stream, max_width_mm):
+        # Same result as run.add_picture(), without python-docx scanning the whole
+        # document for the next shape ID and for an existing image part every time
+        raw = img_stream.getvalue()
+        digest = hashlib.sha1(raw).hexdigest()
+        if digest not in image_rids:
+            image_rids[digest] = doc.part.get_or_add_image(BytesIO(raw))
+        rId, image = image_rids[digest]
+        cx, cy = image.scaled_dimensions(Mm(max_width_mm), None)
+        inline = CT_Inline.new_pic_inline(next(shape_ids), rId, image.filename, cx, cy)
+        drawing = OxmlElement('w:drawing')
+        drawing.append(inline)
+        run.append(drawing)
+
     for i, unit in enumerate(units):
         nopol = unit.get('nopol', 'UNKNOWN')
         bu = unit.get('bu', 'UNKNOWN')
         lokasi = unit.get('lokasi', 'UNKNOWN')
         images = unit.get('images', {})
 
-        # --- PAGE 1: Check Fisik Dokumen ---
-        
         # Header - Matches PDF: "BU : {bu} - {location} - {nopol}"
         header_title = f"BU : {bu} - {lokasi} - {nopol}".upper()
-        
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        run = p.add_run(header_title)
-        run.bold = True
-        run.font.size = Pt(11) # PDF uses 11
-        
-        # Space after header
-        doc.add_paragraph() 
 
-        # doc.add_heading('1. DOKUMEN KENDARAAN', level=2) # Removed to match PDF clean look where visual boxes dominate, or keep if user wants headings?
-        # PDF code has: pdf.cell(..., "FOTO STNK...", ...) inside the box logic.
-        # It DOES NOT have a main heading "1. DOKUMEN KENDARAAN".
-        # It just starts.
-        
-        # But we need some separation. The PDF has "BU : ..." then "FOTO STNK (SURAT TANDA NOMOR KENDARAAN) :"
-        
-        # Table for Documents (STNK, Pajak, KIR)
-        # Layout: 
-        # Row 1: STNK (Full Width)
-        # Row 2: Pajak (Full Width)
-        # Row 3: KIR Kertas (Left), KIR Kartu (Right)
-        
-        table = doc.add_table(rows=3, cols=2)
-        table.style = 'Table Grid'
-        table.autofit = False
-        
-        # Set column widths (Total 190mm)
-        # Col 1: 95mm, Col 2: 95mm (roughly, gap included in cell padding usually)
-        for row in table.rows:
-            for cell in row.cells:
-                cell.width = Mm(95)
-
-        # Helper to fill cell
-        def fill_cell(cell, title, img_key, max_width_mm=85):
-            p = cell.paragraphs[0]
-            p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-            run = p.add_run(title + "\n")
-            run.bold = True
-            
+        elements = [deepcopy(el) for el in template]
+        slots = {}
+        for el in elements:
+            _insert_before_sectpr(body, el)
+            for t in el.iter(qn('w:t')):
+                if t.text == HEADER_MARKER:
+                    t.text = header_title
+                elif t.text and t.text.startswith(SLOT_MARKER):
+                    slots[t.text[len(SLOT_MARKER):-2]] = t
+
+        # Handle both dict with dataUrl or direct string
+        paths = {}
+        for img_key in SLOT_ORDER:
             img_data = images.get(img_key)
             if img_data:
-                # Handle both dict with dataUrl or direct string
-                path = img_data.get('dataUrl') if isinstance(img_data, dict) else img_data
-                
-                img_stream = fetch_image(path)
-                if img_stream:
-                    try:
-                        # Add image, constraining width
-                        run.add_picture(img_stream, width=Mm(max_width_mm))
-                    except Exception as e:
-                        print(f"Error adding picture {img_key}: {e}")
-                        run.add_text(f"[Error loading image]")
-                else:
-                    run.add_text("[Gambar Tidak Ditemukan]")
-            else:
-                run.add_text("[Tidak Ada Gambar]")
-
-        # Row 1: STNK (Merge cells)
-        cell_stnk = table.cell(0, 0)
-        cell_stnk.merge(table.cell(0, 1))
-        # Height constraint approx 85mm
-        fill_cell(cell_stnk, "FOTO STNK (SURAT TANDA NOMOR KENDARAAN) :", 'stnk', max_width_mm=160)
-        
-        # Row 2: Pajak (Merge cells)
-        cell_pajak = table.cell(1, 0)
-        cell_pajak.merge(table.cell(1, 1))
-        fill_cell(cell_pajak, "FOTO LEMBAR PAJAK :", 'tax', max_width_mm=160)
-        
-        # Row 3: KIR (Split)
-        # Height approx 65mm
-        fill_cell(table.cell(2, 0), "FOTO LEMBAR KIR :", 'kir', max_width_mm=85)
-        fill_cell(table.cell(2, 1), "FOTO KARTU KIR :", 'kir_card', max_width_mm=85)
+                paths[img_key] = img_data.get('dataUrl') if isinstance(img_data, dict) else img_data
+        # All photos of the unit are fetched concurrently
+        streams = dict(zip(paths, resolver.fetch_many(paths.values())))
+        unit_start = time.perf_counter()
 
-        doc.add_page_break()
+        for img_key in SLOT_ORDER:
+            t = slots[img_key]
+            if img_key not in paths:
+                t.text = "[Tidak Ada Gambar]"
+                continue
 
-        # --- PAGE 2: Foto Fisik Kendaraan ---
-        
-        # Header (Repeated for context)
-        # pdf_generator page 2 has header too
-        p = doc.add_paragraph()
-        p.alignment = WD_ALIGN_PARAGRAPH.LEFT
-        run = p.add_run(header_title)
-        run.bold = True
-        run.font.size = Pt(11)
-        
-        doc.add_paragraph() # Spacer
-        
-        # doc.add_heading('2. KONDISI FISIK', level=2) # Removed to match PDF
+            img_stream = streams[img_key]
+            if progress:
+                progress("fetch", i, img_key)
+            if not img_stream:
+                t.text = "[Gambar Tidak Ditemukan]"
+                continue
 
-        # Table for Physical Photos
-        # Row 1: Depan, Belakang
-        # Row 2: Kanan, Kiri
-        
-        table_phys = doc.add_table(rows=2, cols=2)
-        table_phys.style = 'Table Grid'
-        
-        fill_cell(table_phys.cell(0, 0), "TAMPAK DEPAN", 'front', max_width_mm=85)
-        fill_cell(table_phys.cell(0, 1), "TAMPAK BELAKANG", 'back', max_width_mm=85)
-        fill_cell(table_phys.cell(1, 0), "TAMPAK SAMPING KANAN", 'right', max_width_mm=85)
-        fill_cell(table_phys.cell(1, 1), "TAMPAK SAMPING KIRI", 'left', max_width_mm=85)
+            max_width_mm = SLOT_WIDTHS_MM[img_key]
+            try:
+                if DOCX_IMAGE_DPI > 0:
+                    img_stream, _, _, before, after = downsample_to_box(img_stream, max_width_mm, None, DOCX_IMAGE_DPI, DOCX_JPEG_QUALITY)
+                    image_bytes["original"] += before
+                    image_bytes["embedded"] += after
+
+                # Add image, constraining width
+                run = t.getparent()
+                run.remove(t)
+                add_picture(run, img_stream, max_width_mm)
+            except Exception as e:
+                print(f"Error adding picture {img_key}: {e}")
+                t.text = "[Error loading image]"
+                if t.getparent() is None:
+                    run.append(t)
 
-        doc.add_page_break()
+        metrics.UNIT_RENDER_SECONDS.observe(time.perf_counter() - unit_start, format="docx")
+        if progress:
+            progress("render", i)
 
     # --- PAGE 3: Summary (Rekapitulasi) ---
     doc.add_heading('REKAPITULASI ASET KENDARAAN', level=1)
@@ -245,4 +307,9 @@ def create_multiset_docx(data, output_path):
             row_cells[3].text = ", ".join(missing)
 
     doc.save(output_path)
+    metrics.REPORT_SECONDS.observe(time.perf_counter() - start, format="docx")
+    metrics.REPORT_BYTES.observe(os.path.getsize(output_path), format="docx")
+
+    if DOCX_IMAGE_DPI > 0:
+        print(f"INFO: DOCX images resampled, saved {(image_bytes['original'] - image_bytes['embedded']) / 1024:.0f} KB")
     return output_path
@@ -0,0 +1,190 @@
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Bounded pools for CPU-heavy work so async endpoints don't block the event loop.
+# Inference (YOLO/OpenCV) and document rendering (fpdf2/python-docx) get separate
+# limits, so a big report can't starve /crop or /proxy-image.
+#
+# Config (env):
+#   INFERENCE_WORKERS / INFERENCE_POOL_KIND   (thread|process)
+#   RENDER_WORKERS    / RENDER_POOL_KIND      (thread|process)
+#   RENDER_MAX_QUEUE  max jobs waiting for a render worker (0 = unlimited)
+
+
+class PoolBusy(Exception):
+    """Raised when a pool's wait queue is full."""
+
+
+def _timed_call(fn, args, kwargs):
+    # Runs in the worker (thread or child process). Wall clock, so it is
+    # comparable with the submit time taken in the parent process.
+    started = time.time()
+    return started, fn(*args, **kwargs)
+
+
+class BoundedExecutor:
+    def __init__(self, name, max_workers, kind="thread", max_queue=0):
+        self.name = name
+        self.max_workers = max_workers
+        self.kind = kind
+        self.max_queue = max_queue
+        self._executor = None
+        self._stream_executor = None
+        self._lock = threading.Lock()
+
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def _get_executor(self):
+        # Created on first use, so importing this module never spawns processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+        return self._executor
+
+    def _get_stream_executor(self):
+        # Generators can't move between processes; a process pool streams from
+        # its own threads, with the same worker limit
+        if self.kind != "process":
+            return self._get_executor()
+        if self._stream_executor is None:
+            with self._lock:
+                if self._stream_executor is None:
+                    self._stream_executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"{self.name}-stream")
+        return self._stream_executor
+
+    @property
+    def queue_depth(self):
+        return max(0, self.in_flight - self.max_workers)
+
+    def _check_queue(self):
+        # Caller holds self._lock
+        if self.max_queue and self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise PoolBusy(f"{self.name} pool is busy ({self.queue_depth} jobs waiting)")
+
+    def _record_done(self, wait):
+        with self._lock:
+            self.completed += 1
+            self.total_wait += wait
+            self.last_wait = wait
+            self.max_wait = max(self.max_wait, wait)
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) in the pool and awaits the result."""
+        with self._lock:
+            self._check_queue()
+            self.in_flight += 1
+            self.submitted += 1
+
+        submitted_at = time.time()
+        loop = asyncio.get_running_loop()
+        try:
+            started_at, result = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+        self._record_done(max(0.0, started_at - submitted_at))
+        return result
+
+    def stream(self, gen):
+        """
+        Iterates a (sync) generator in the pool as an async generator, one next()
+        per worker task. Raises PoolBusy right away if the queue is full; while
+        it is being iterated the generator counts as one in-flight job.
+        """
+        with self._lock:
+            self._check_queue()
+        return self._iterate(gen)
+
+    async def _iterate(self, gen):
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+
+        executor = self._get_stream_executor()
+        loop = asyncio.get_running_loop()
+        done = object()
+        submitted_at = time.time()
+        try:
+            started_at, item = await loop.run_in_executor(executor, _timed_call, next, (gen, done), {})
+            while item is not done:
+                yield item
+                item = await loop.run_in_executor(executor, next, gen, done)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            try:
+                gen.close()
+            except ValueError:
+                # Cancelled while a next() is still running in a worker
+                pass
+
+        self._record_done(max(0.0, started_at - submitted_at))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_wait_seconds": self.total_wait / self.completed if self.completed else 0.0,
+                "max_wait_seconds": self.max_wait,
+                "last_wait_seconds": self.last_wait,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._stream_executor is not None:
+            self._stream_executor.shutdown(wait=False, cancel_futures=True)
+            self._stream_executor = None
+
+
+# Inference workers mostly wait on the YOLO micro-batcher (see main.crop_scheduler),
+# so there should be at least as many as the batch size.
+inference_pool = BoundedExecutor(
+    "inference",
+    int(os.environ.get("INFERENCE_WORKERS", "8")),
+    os.environ.get("INFERENCE_POOL_KIND", "thread"),
+)
+
+render_pool = BoundedExecutor(
+    "render",
+    int(os.environ.get("RENDER_WORKERS", "2")),
+    os.environ.get("RENDER_POOL_KIND", "thread"),
+    int(os.environ.get("RENDER_MAX_QUEUE", "0")),
+)
+
+
+def pool_stats():
+    return {pool.name: pool.stats() for pool in (inference_pool, render_pool)}
@@ -0,0 +1,203 @@
+import io
+import os
+import copy
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from fpdf import FPDF
+from fpdf.fonts import TTFFont, SubsetMap
+from fontTools import ttLib
+
+# Fonts for the PDF report, resolved and parsed once per process.
+# Calibri is used when available; otherwise Carlito, which is metric-compatible
+# (same widths, so the layout does not change), e.g. from fonts-crosextra-carlito.
+#
+# Config (env):
+#   FONT_DIR                directory searched first for the font files
+#   FONT_SUBSET_CACHE_SIZE  compiled font subsets kept per style
+FONT_DIR = os.environ.get("FONT_DIR", "fonts")
+FONT_SUBSET_CACHE_SIZE = int(os.environ.get("FONT_SUBSET_CACHE_SIZE", "256"))
+
+FONT_FAMILY = "Calibri"
+
+# Same family for all three styles, first complete set wins
+FONT_FILE_SETS = [
+    {"": "calibri.ttf", "B": "calibrib.ttf", "I": "calibrii.ttf"},
+    {"": "Carlito-Regular.ttf", "B": "Carlito-Bold.ttf", "I": "Carlito-Italic.ttf"},
+]
+
+SEARCH_DIRS = [
+    FONT_DIR,
+    r"C:\Windows\Fonts",
+    ".",
+    "/usr/share/fonts/truetype/crosextra",
+    "/usr/share/fonts/google-carlito-fonts",
+    "/usr/share/fonts/carlito",
+]
+
+
+class SubsetCache:
+    """
+    Compiled font subsets keyed by their glyph order. Reports mostly use the same
+    characters, so the same subset is compiled over and over; this keeps the bytes.
+    """
+    def __init__(self, max_items=None):
+        self.max_items = FONT_SUBSET_CACHE_SIZE if max_items is None else max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is None:
+                self.misses += 1
+            else:
+                self._items.move_to_end(key)
+                self.hits += 1
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._items[key] = data
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+
+class _CachedSubsetTTFont(ttLib.TTFont):
+    # fpdf2 subsets the font in place and then calls save(); after subsetting the
+    # glyph order fully determines the output, so compiled bytes can be reused.
+    subset_cache = None
+
+    def save(self, file, reorderTables=True):
+        key = tuple(self.getGlyphOrder())
+        data = self.subset_cache.get(key)
+        if data is None:
+            buf = io.BytesIO()
+            super().save(buf, reorderTables)
+            data = buf.getvalue()
+            self.subset_cache.put(key, data)
+        file.write(data)
+
+
+class FontRegistry:
+    """
+    Finds the report font once and keeps its parsed metrics (widths, cmap,
+    glyph IDs, descriptor), the raw file bytes and a cache of compiled subsets.
+
+    fpdf2 subsets the fontTools object in place when a document is written, so
+    each document gets its own lightweight TTFont opened lazily from the cached
+    bytes; everything that is expensive to compute is shared.
+
+    Sharing relies on fpdf2 internals (pinned in requirements.txt). If that
+    fails, e.g. after an fpdf2 upgrade, each document loads the font files
+    itself with pdf.add_font(), and Helvetica is the last resort.
+    """
+    def __init__(self, search_dirs=None, file_sets=None, family=FONT_FAMILY):
+        self.search_dirs = search_dirs if search_dirs is not None else SEARCH_DIRS
+        self.file_sets = file_sets or FONT_FILE_SETS
+        self.family = family
+        self._templates = None
+        self._lock = threading.Lock()
+        self.paths = {}
+        self.loads = 0
+        # Set once sharing the parsed font failed; later documents use add_font() directly
+        self.shared_failed = False
+
+    def _find(self):
+        for directory in self.search_dirs:
+            for file_set in self.file_sets:
+                paths = {style: os.path.join(directory, name) for style, name in file_set.items()}
+                if all(os.path.exists(path) for path in paths.values()):
+                    return paths
+        return None
+
+    def _load(self):
+        paths = self._find()
+        if not paths:
+            print(f"Warning: {self.family} font (or Carlito) not found in {self.search_dirs}. Falling back to Helvetica.")
+            return {}
+
+        self.paths = paths
+        templates = {}
+        parser = FPDF()
+        try:
+            for style, path in paths.items():
+                fontkey = f"{self.family.lower()}{style}"
+                with open(path, "rb") as f:
+                    data = f.read()
+                template = TTFFont(parser, Path(path), fontkey, style)
+                # Only the metrics are kept; the per-document font is reopened from `data`
+                template.ttfont.close()
+                templates[style] = (template, data, SubsetCache())
+        except Exception as e:
+            print(f"WARN: Could not pre-parse {self.family} font, loading it per document. Error: {e}")
+            self.shared_failed = True
+            return {}
+
+        self.loads += 1
+        print(f"INFO: Loaded report font from {os.path.dirname(paths[''])}")
+        return templates
+
+    def templates(self):
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = self._load()
+        return self._templates
+
+    def install(self, pdf):
+        """Adds the report font to a new FPDF document. Returns the family to use."""
+        templates = self.templates()
+        if templates and not self.shared_failed:
+            try:
+                self._install_shared(pdf, templates)
+                return self.family
+            except Exception as e:
+                print(f"WARN: Could not share the parsed {self.family} font, loading it per document. Error: {e}")
+                self.shared_failed = True
+                for template, _, _ in templates.values():
+                    pdf.fonts.pop(template.fontkey, None)
+
+        if not self.paths:
+            return "Helvetica"
+        try:
+            for style, path in self.paths.items():
+                pdf.add_font(self.family, style, path)
+            return self.family
+        except Exception as e:
+            print(f"Warning: Could not load {self.family} font, falling back to Helvetica. Error: {e}")
+            return "Helvetica"
+
+    def _install_shared(self, pdf, templates):
+        for style, (template, data, subset_cache) in templates.items():
+            font = copy.copy(template)
+            font.i = len(pdf.fonts) + 1
+            font.ttfont = _CachedSubsetTTFont(io.BytesIO(data), recalcTimestamp=False, lazy=True)
+            font.ttfont.subset_cache = subset_cache
+            font.subset = SubsetMap(font)
+            font.missing_glyphs = []
+            font.biggest_size_pt = 0
+            font._hbfont = None
+            font.color_font = None
+            pdf.fonts[template.fontkey] = font
+
+    def stats(self):
+        templates = self._templates or {}
+        return {
+            "font": os.path.dirname(self.paths[""]) if self.paths else None,
+            "subset_cache_hits": sum(cache.hits for _, _, cache in templates.values()),
+            "subset_cache_misses": sum(cache.misses for _, _, cache in templates.values()),
+        }
+
+    def reset(self):
+        with self._lock:
+            self._templates = None
+            self.paths = {}
+            self.shared_failed = False
+
+
+font_registry = FontRegistry()
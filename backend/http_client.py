@@ -0,0 +1,78 @@
+import os
+import asyncio
+import threading
+import weakref
+import requests
+from requests.adapters import HTTPAdapter
+import httpx
+
+# One pooled client per process for all outbound image fetches.
+# Reusing connections avoids a new TCP+TLS handshake for every image.
+POOL_HOSTS = int(os.environ.get("HTTP_POOL_HOSTS", "10"))
+POOL_PER_HOST = int(os.environ.get("HTTP_POOL_PER_HOST", "16"))
+KEEPALIVE_EXPIRY = float(os.environ.get("HTTP_KEEPALIVE_SECONDS", "60"))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_session = None
+_session_lock = threading.Lock()
+
+# AsyncClient connections are bound to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_session():
+    """
+    Returns the process-wide requests.Session.
+    Connections are kept alive and limited to POOL_PER_HOST per host
+    (callers block for a free connection instead of opening more).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=POOL_PER_HOST, pool_block=True)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({'User-Agent': USER_AGENT})
+                # SSL verify disabled, same as the previous per-call sessions
+                session.verify = False
+                _session = session
+    return _session
+
+
+def get_async_client():
+    """
+    Returns the pooled httpx.AsyncClient for the running event loop.
+    Uses HTTP/2 when the h2 package is installed.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            verify=False,
+            follow_redirects=True,
+            headers={'User-Agent': USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=POOL_HOSTS * POOL_PER_HOST,
+                max_keepalive_connections=POOL_HOSTS * POOL_PER_HOST,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+def close_clients():
+    global _session
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,58 @@
+import io
+from PIL import Image
+
+MM_PER_INCH = 25.4
+
+
+def target_pixels(box_w_mm, box_h_mm, dpi):
+    """Pixel size a box of box_w_mm x box_h_mm needs at the given DPI."""
+    return max(1, int(round(box_w_mm / MM_PER_INCH * dpi))), max(1, int(round(box_h_mm / MM_PER_INCH * dpi)))
+
+
+def downsample_to_box(image_source, box_w_mm, box_h_mm, dpi, quality=85):
+    """
+    Resamples an image so it is no larger than what its layout box needs at `dpi`,
+    then re-encodes it as JPEG with `quality`.
+    Images that are already small enough (or would get bigger) are returned unchanged.
+    box_h_mm may be None to constrain only the width (DOCX pictures).
+
+    Returns (BytesIO, width, height, original_bytes, new_bytes).
+    """
+    data = image_source.getvalue()
+    original_size = len(data)
+
+    with Image.open(io.BytesIO(data)) as img:
+        img_w, img_h = img.size
+        max_w, max_h = target_pixels(box_w_mm, box_h_mm or box_w_mm, dpi)
+        scale = max_w / img_w if box_h_mm is None else min(max_w / img_w, max_h / img_h)
+
+        if scale >= 1:
+            image_source.seek(0)
+            return image_source, img_w, img_h, original_size, original_size
+
+        new_w = max(1, int(img_w * scale))
+        new_h = max(1, int(img_h * scale))
+
+        # draft() lets the JPEG decoder skip detail we are going to throw away
+        if img.format == "JPEG":
+            img.draft("RGB", (new_w, new_h))
+
+        if img.mode in ("RGBA", "LA", "P"):
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, (255, 255, 255))
+            img.paste(rgba, mask=rgba.split()[-1])
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+
+        resized = img.resize((new_w, new_h), Image.LANCZOS)
+
+    out = io.BytesIO()
+    resized.save(out, format="JPEG", quality=quality, optimize=True)
+    new_size = out.tell()
+
+    if new_size >= original_size:
+        image_source.seek(0)
+        return image_source, img_w, img_h, original_size, original_size
+
+    out.seek(0)
+    return out, new_w, new_h, original_size, new_size
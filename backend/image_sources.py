@@ -0,0 +1,349 @@
+import io
+import os
+import base64
+import asyncio
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from asset_store import is_asset_id, get_asset_path
+from http_client import get_session, get_async_client
+
+# One place that turns an image reference from a report into bytes.
+# Backends, tried in order:
+#   asset   - asset ID from POST /assets (64 hex chars)
+#   dataurl - data:image/...;base64,...
+#   drive   - Google Drive links (cached, thumbnail-then-original, see pdf_generator)
+#   http    - other http(s) URLs, only on hosts in IMAGE_HTTP_ALLOWED_HOSTS
+#   local   - local/NFS files: "local://<name>/<relative path>" for a directory
+#             configured in IMAGE_SOURCE_DIRS
+# References are client input: bare filesystem paths and URLs on other hosts
+# are not resolved at all (no file reads, no requests to internal hosts).
+#
+# Config (env):
+#   IMAGE_SOURCE_DIRS         named directories, "nas=/mnt/nas/foto,share=/srv/foto"
+#   IMAGE_HTTP_ALLOWED_HOSTS  hosts plain http(s) images may come from, "img.example.com,cdn.example.com"
+#   IMAGE_RESOLVE_WORKERS     concurrency of fetch_many / probe_many
+IMAGE_SOURCE_DIRS = os.environ.get("IMAGE_SOURCE_DIRS", "")
+IMAGE_HTTP_ALLOWED_HOSTS = os.environ.get("IMAGE_HTTP_ALLOWED_HOSTS", "")
+RESOLVE_WORKERS = int(os.environ.get("IMAGE_RESOLVE_WORKERS", "8"))
+
+LOCAL_PREFIX = "local://"
+
+
+def _image_info(fileobj):
+    # Pillow only reads the header here, not the pixel data
+    try:
+        with Image.open(fileobj) as img:
+            return {"width": img.width, "height": img.height, "format": img.format}
+    except Exception:
+        return {}
+
+
+class ImageSource:
+    """
+    Backend interface. fetch() returns a BytesIO or None, probe() returns a dict
+    with at least "exists" and, when known, "bytes" and "content_type",
+    without downloading the whole image where the backend allows it.
+    """
+    name = "base"
+    # Remote sources may be proxied to the browser; local ones never are
+    remote = False
+
+    def matches(self, ref):
+        raise NotImplementedError
+
+    def fetch(self, ref):
+        raise NotImplementedError
+
+    def probe(self, ref):
+        data = self.fetch(ref)
+        if data is None:
+            return {"exists": False}
+        size = data.getbuffer().nbytes
+        return {"exists": True, "bytes": size, **_image_info(data)}
+
+    def _safe_fetch(self, ref):
+        try:
+            return self.fetch(ref)
+        except Exception as e:
+            print(f"Error fetching image from {self.name}: {e}")
+            return None
+
+    def _safe_probe(self, ref):
+        try:
+            return self.probe(ref)
+        except Exception as e:
+            return {"exists": False, "error": str(e)}
+
+    def fetch_many(self, refs, max_workers=None):
+        """fetch() for a batch of references of this backend, None for failures."""
+        return _map(self._safe_fetch, refs, max_workers)
+
+    def probe_many(self, refs, max_workers=None):
+        return _map(self._safe_probe, refs, max_workers)
+
+    async def fetch_async(self, ref):
+        return await asyncio.to_thread(self.fetch, ref)
+
+
+def _map(fn, items, max_workers=None):
+    items = list(items)
+    if len(items) <= 1:
+        return [fn(item) for item in items]
+    workers = min(max_workers or RESOLVE_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolve") as executor:
+        return list(executor.map(fn, items))
+
+
+class AssetSource(ImageSource):
+    name = "asset"
+
+    def matches(self, ref):
+        return is_asset_id(ref)
+
+    def fetch(self, ref):
+        path = get_asset_path(ref)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            return io.BytesIO(f.read())
+
+    def probe(self, ref):
+        path = get_asset_path(ref)
+        if not path:
+            return {"exists": False}
+        with open(path, "rb") as f:
+            return {"exists": True, "bytes": os.path.getsize(path), **_image_info(f)}
+
+
+class DataUrlSource(ImageSource):
+    name = "dataurl"
+
+    def matches(self, ref):
+        return ref.startswith("data:image")
+
+    def fetch(self, ref):
+        if "," not in ref:
+            return None
+        _, encoded = ref.split(",", 1)
+        return io.BytesIO(base64.b64decode(encoded))
+
+    def probe(self, ref):
+        if "," not in ref:
+            return {"exists": False}
+        header, encoded = ref.split(",", 1)
+        encoded = encoded.strip()
+        # Decoded size from the base64 length, no decoding needed
+        size = len(encoded) * 3 // 4 - encoded[-2:].count("=")
+        return {"exists": size > 0, "bytes": size, "content_type": header[5:].split(";")[0]}
+
+
+class DriveSource(ImageSource):
+    name = "drive"
+    remote = True
+
+    def matches(self, ref):
+        return "drive.google.com" in ref
+
+    def fetch(self, ref):
+        from pdf_generator import fetch_drive_image
+        return fetch_drive_image(ref)
+
+    async def fetch_async(self, ref):
+        from pdf_generator import fetch_drive_image_async
+        return await fetch_drive_image_async(ref)
+
+    def probe(self, ref):
+        import pdf_generator
+
+        file_id = pdf_generator.extract_drive_file_id(ref)
+        if not file_id:
+            return {"exists": False}
+        cached = pdf_generator.drive_cache.get(file_id)
+        if cached is not None:
+            return {"exists": True, "bytes": len(cached), "cached": True}
+
+        # HEAD on the download URL: existence and size, no body
+        url = f"{pdf_generator.DRIVE_BASE_URL}/uc?export=download&id={file_id}"
+        try:
+            response = get_session().head(url, timeout=10, verify=False, allow_redirects=True)
+        except Exception as e:
+            return {"exists": False, "error": str(e)}
+        content_type = response.headers.get("Content-Type", "")
+        exists = response.status_code == 200 and "text/html" not in content_type
+        length = response.headers.get("Content-Length")
+        return {
+            "exists": exists,
+            "bytes": int(length) if exists and length else None,
+            "content_type": content_type or None,
+        }
+
+
+class HttpSource(ImageSource):
+    name = "http"
+    remote = True
+
+    def __init__(self, allowed_hosts=None):
+        if allowed_hosts is None:
+            allowed_hosts = IMAGE_HTTP_ALLOWED_HOSTS.split(",")
+        self.allowed_hosts = {host.strip().lower() for host in allowed_hosts if host.strip()}
+
+    def matches(self, ref):
+        if not ref.startswith(("http://", "https://")):
+            return False
+        try:
+            host = urlparse(ref).hostname
+        except ValueError:
+            return False
+        return bool(host) and host.lower() in self.allowed_hosts
+
+    def fetch(self, ref):
+        # Pooled keep-alive session, no Drive thumbnail round trip.
+        # No redirects: they could lead off the allowed hosts.
+        response = get_session().get(ref, verify=False, timeout=10, allow_redirects=False)
+        if response.status_code != 200:
+            return None
+        return io.BytesIO(response.content)
+
+    async def fetch_async(self, ref):
+        response = await get_async_client().get(ref, timeout=10, follow_redirects=False)
+        if response.status_code != 200:
+            return None
+        return io.BytesIO(response.content)
+
+    def probe(self, ref):
+        try:
+            response = get_session().head(ref, timeout=10, verify=False, allow_redirects=False)
+        except Exception as e:
+            return {"exists": False, "error": str(e)}
+        length = response.headers.get("Content-Length")
+        return {
+            "exists": response.status_code == 200,
+            "bytes": int(length) if length else None,
+            "content_type": response.headers.get("Content-Type"),
+        }
+
+
+def parse_source_dirs(value):
+    """"nas=/mnt/nas,share=/srv/foto" -> {"nas": "/mnt/nas", "share": "/srv/foto"}"""
+    dirs = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, path = item.split("=", 1)
+            dirs[name.strip()] = os.path.abspath(path.strip())
+    return dirs
+
+
+class LocalDirSource(ImageSource):
+    name = "local"
+
+    def __init__(self, directories=None):
+        self.directories = parse_source_dirs(IMAGE_SOURCE_DIRS) if directories is None else directories
+
+    def matches(self, ref):
+        # Only refs inside a configured directory; everything else stays unresolved
+        return self.path_for(ref) is not None
+
+    def path_for(self, ref):
+        """Local path of a reference, or None if it points outside its directory."""
+        if not ref.startswith(LOCAL_PREFIX):
+            return None
+        name, _, rel = ref[len(LOCAL_PREFIX):].partition("/")
+        root = self.directories.get(name)
+        if root is None:
+            return None
+        path = os.path.abspath(os.path.join(root, rel))
+        if os.path.commonpath([root, path]) != root:
+            return None
+        return path
+
+    def fetch(self, ref):
+        path = self.path_for(ref)
+        if not path or not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return io.BytesIO(f.read())
+
+    def probe(self, ref):
+        path = self.path_for(ref)
+        if not path or not os.path.isfile(path):
+            return {"exists": False}
+        with open(path, "rb") as f:
+            return {"exists": True, "bytes": os.path.getsize(path), **_image_info(f)}
+
+
+class ImageResolver:
+    def __init__(self, sources):
+        self.sources = sources
+
+    def source_for(self, ref):
+        if not isinstance(ref, str) or not ref:
+            return None
+        for source in self.sources:
+            if source.matches(ref):
+                return source
+        return None
+
+    def fetch(self, ref):
+        """Returns the image as BytesIO, or None if it can't be resolved."""
+        source = self.source_for(ref)
+        if source is None:
+            return None
+        return source._safe_fetch(ref)
+
+    def probe(self, ref):
+        source = self.source_for(ref)
+        if source is None:
+            return {"exists": False, "source": None}
+        result = source._safe_probe(ref)
+        result["source"] = source.name
+        return result
+
+    def _batch(self, method, refs, max_workers):
+        # Grouped by backend so each one batches its own way; results keep input order
+        refs = list(refs)
+        results = [None] * len(refs)
+        groups = {}
+        for i, ref in enumerate(refs):
+            source = self.source_for(ref)
+            if source is not None:
+                groups.setdefault(source, []).append(i)
+
+        def run(item):
+            source, indexes = item
+            return source, indexes, getattr(source, method)([refs[i] for i in indexes], max_workers)
+
+        for source, indexes, values in _map(run, list(groups.items()), max_workers):
+            for i, value in zip(indexes, values):
+                results[i] = value
+        return results, groups
+
+    def fetch_many(self, refs, max_workers=None):
+        """fetch() for many references concurrently, in input order. Failures are None."""
+        results, _ = self._batch("fetch_many", refs, max_workers)
+        return results
+
+    def probe_many(self, refs, max_workers=None):
+        """probe() for many references concurrently, in input order."""
+        results, groups = self._batch("probe_many", refs, max_workers)
+        for source, indexes in groups.items():
+            for i in indexes:
+                results[i]["source"] = source.name
+        return [r if r is not None else {"exists": False, "source": None} for r in results]
+
+    async def fetch_async(self, ref, remote_only=False):
+        source = self.source_for(ref)
+        if source is None or (remote_only and not source.remote):
+            return None
+        return await source.fetch_async(ref)
+
+
+resolver = ImageResolver([
+    AssetSource(),
+    DataUrlSource(),
+    DriveSource(),
+    HttpSource(),
+    LocalDirSource(),
+])
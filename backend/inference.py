@@ -0,0 +1,164 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future
+
+# CPU inference backends for the YOLO model.
+#   torch    - PyTorch weights as-is (slowest on CPU)
+#   onnx     - exported once to <model>.onnx, run with ONNX Runtime
+#   openvino - exported once to <model>_openvino_model/, run with OpenVINO
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def _export_path(model_path, backend):
+    stem = os.path.splitext(model_path)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    return stem + "_openvino_model"
+
+
+def _tune_onnx_threads(yolo, onnx_path, threads):
+    """
+    Ultralytics creates the ONNX Runtime session with default options.
+    Recreate it with a fixed intra-op thread count (best effort, depends on
+    the ultralytics version).
+    """
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+
+    auto_backend = yolo.predictor.model
+    target = auto_backend.__dict__.get("backend", auto_backend)
+    target.session = session
+
+
+def load_yolo(model_path, backend="torch", threads=0, warmup_image=None):
+    """
+    Loads the YOLO model on the requested backend, exporting and caching the
+    ONNX/OpenVINO build next to the weights on first use.
+    Falls back to PyTorch if the backend is not available.
+    Returns (model, backend_actually_used).
+    """
+    from ultralytics import YOLO
+
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    if backend not in BACKENDS:
+        print(f"WARN: Unknown inference backend '{backend}', using torch")
+        backend = "torch"
+
+    if backend != "torch":
+        try:
+            exported = _export_path(model_path, backend)
+            if not os.path.exists(exported):
+                print(f"INFO: Exporting {model_path} to {backend} (one-time)...")
+                # dynamic=True so the micro-batcher can send batches > 1
+                exported = YOLO(model_path).export(format=backend, dynamic=True)
+
+            model = YOLO(exported, task="detect")
+            if warmup_image is not None:
+                model(warmup_image, verbose=False)
+                if backend == "onnx" and threads:
+                    try:
+                        _tune_onnx_threads(model, exported, threads)
+                    except Exception as e:
+                        print(f"WARN: Could not set ONNX Runtime threads ({e})")
+            return model, backend
+        except Exception as e:
+            print(f"WARN: {backend} backend not available ({e}). Falling back to torch.")
+
+    model = YOLO(model_path)
+    if warmup_image is not None:
+        model(warmup_image, verbose=False)
+    return model, "torch"
+
+
+class BatchScheduler:
+    """
+    Micro-batching front for a model call.
+
+    Callers submit one input each. A single worker thread collects pending
+    inputs until it has `max_batch_size` of them or `max_wait_ms` has passed
+    since the first one arrived, then makes ONE call to `predict_batch(inputs)`
+    which must return one result per input, in order.
+    """
+    def __init__(self, predict_batch, max_batch_size=8, max_wait_ms=5, name="batch-scheduler"):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+        self.batches = 0
+        self.items = 0
+        self.max_seen_batch = 0
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def submit(self, item):
+        """Queues one input. Returns a Future with its result."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def predict(self, item, timeout=None):
+        """Blocking helper: submit and wait for the result."""
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            inputs = [item for item, _ in batch]
+            try:
+                results = list(self.predict_batch(inputs))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self.name}: predict_batch returned {len(results)} results for {len(batch)} inputs")
+                for (_, future), result in zip(batch, results):
+                    # A caller may have cancelled its future while it was queued
+                    if not future.done():
+                        future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+            self.batches += 1
+            self.items += len(batch)
+            self.max_seen_batch = max(self.max_seen_batch, len(batch))
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "max_batch_size_seen": self.max_seen_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
@@ -0,0 +1,180 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Background report jobs: a big ReportRequest is submitted, rendered by a
+# worker and downloaded later, so it doesn't have to fit in one HTTP request.
+#
+# Config (env):
+#   JOB_WORKERS            reports rendered at the same time
+#   JOB_RETENTION_SECONDS  how long finished jobs (and their files) are kept
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_RETENTION_SECONDS = int(os.environ.get("JOB_RETENTION_SECONDS", "3600"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised from the progress callback to stop a cancelled job."""
+
+
+class Job:
+    def __init__(self, kind, total_units, output_path, media_type, filename, assets=()):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.total_units = total_units
+        self.output_path = output_path
+        self.media_type = media_type
+        self.filename = filename
+        # Asset IDs the job renders; kept by the scratch sweeper until it finishes
+        self.assets = frozenset(assets)
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.counts = {"fetch": 0, "crop": 0, "render": 0}
+        self.events = []
+        self.cancel_requested = threading.Event()
+        self.future = None
+        self._lock = threading.Lock()
+
+    def _add_event(self, event):
+        event["seq"] = len(self.events)
+        event["time"] = time.time()
+        self.events.append(event)
+
+    def progress(self, stage, unit_index, image_key=None):
+        """Progress callback handed to the generators."""
+        if self.cancel_requested.is_set():
+            raise JobCancelled()
+        with self._lock:
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+            self._add_event({"type": "progress", "stage": stage, "unit": unit_index, "image": image_key})
+
+    def set_status(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            if status in FINISHED:
+                self.finished_at = time.time()
+            self._add_event({"type": "status", "status": status, "error": error})
+
+    def events_since(self, seq):
+        with self._lock:
+            return self.events[seq:]
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "error": self.error,
+                "total_units": self.total_units,
+                "units_rendered": self.counts.get("render", 0),
+                "images_fetched": self.counts.get("fetch", 0),
+                "images_cropped": self.counts.get("crop", 0),
+                "created_at": self.created_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobManager:
+    def __init__(self, max_workers=None, retention_seconds=None):
+        self.max_workers = max_workers or JOB_WORKERS
+        self.retention_seconds = JOB_RETENTION_SECONDS if retention_seconds is None else retention_seconds
+        self._executor = None
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def submit(self, kind, fn, args, total_units, output_path, media_type, filename, assets=()):
+        """
+        Queues fn(*args, progress=job.progress), which must write output_path.
+        `assets` are the asset IDs it reads (see pending_assets). Returns the Job.
+        """
+        self.purge()
+        job = Job(kind, total_units, output_path, media_type, filename, assets)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._get_executor().submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        if job.cancel_requested.is_set():
+            job.set_status(CANCELLED)
+            return
+        job.set_status(RUNNING)
+        try:
+            fn(*args, progress=job.progress)
+            job.set_status(DONE)
+        except JobCancelled:
+            self._remove_output(job)
+            job.set_status(CANCELLED)
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            self._remove_output(job)
+            job.set_status(FAILED, str(e))
+
+    def get(self, job_id):
+        # Expired jobs are never served, even between two purges
+        self.purge()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancels a queued job right away, a running one at its next progress step."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.status not in FINISHED:
+            job.cancel_requested.set()
+            if job.future is not None and job.future.cancel():
+                job.set_status(CANCELLED)
+        return job
+
+    @staticmethod
+    def _remove_output(job):
+        if job.output_path and os.path.exists(job.output_path):
+            os.remove(job.output_path)
+
+    def purge(self):
+        """Forgets finished jobs older than retention_seconds and deletes their files."""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and now - job.finished_at > self.retention_seconds
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            self._remove_output(job)
+
+    def pending_assets(self):
+        """Asset IDs used by queued or running jobs."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.status not in FINISHED]
+        return set().union(*(job.assets for job in jobs))
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in (QUEUED, RUNNING, DONE, FAILED, CANCELLED)}
+
+
+job_manager = JobManager()
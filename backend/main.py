@@ -1,11 +1,21 @@
 import os
-import shutil
+import time
 import uuid
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import FileResponse, StreamingResponse
+import json
+import asyncio
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, StreamingResponse, Response, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from ultralytics import YOLO
-import cv2
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as FormFile, Headers, MutableHeaders, QueryParams
+import threading
+from executors import inference_pool, render_pool, pool_stats, PoolBusy
+from inference import BatchScheduler, load_yolo
+from scratch import SCRATCH_DIR, start_sweeper, add_sweep_hook, add_keep_hook, remove_file, disk_usage
+import metrics
+import profiler
 
 app = FastAPI()
 
@@ -18,95 +28,241 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load model (lazy loading or at start)
-# Using yolov8n.pt as requested. It will download automatically on first use if not present.
-model = YOLO('yolov8n.pt') 
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    metrics.HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        # Route template, not the raw path, so job IDs don't create new series
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
 
-UPLOAD_DIR = "temp_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Endpoints that can be profiled per request with "X-Profile: 1" or "?profile=1"
+PROFILED_PATHS = ("/generate-multiset", "/generate-multiset-docx", "/crop")
 
-def ai_smart_crop(image_path, output_path):
+class ProfileMiddleware:
     """
-    Detects the first object using YOLOv8 and crops the image with a margin.
+    Samples the process while a request that asked for it runs and stores the
+    collapsed stacks (flame graph input), downloadable via X-Profile-Url.
+    Plain ASGI: every other request is passed straight through, at no cost.
     """
-    results = model(image_path)
-    img = cv2.imread(image_path)
-    
-    # Check if image loaded correctly
-    if img is None:
-        return False
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _requested(scope):
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            return False
+        flag = Headers(scope=scope).get("X-Profile") or QueryParams(scope["query_string"]).get("profile")
+        return bool(flag) and flag.lower() not in ("0", "false", "no")
+
+    async def __call__(self, scope, receive, send):
+        if not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not profiler.PROFILING_ENABLED:
+            response = JSONResponse(status_code=403, content={"detail": "Profiling is disabled (PROFILING_ENABLED)"})
+            await response(scope, receive, send)
+            return
+
+        profile_id = profiler.new_profile_id()
+
+        async def send_with_profile_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Profile-Id"] = profile_id
+                headers["X-Profile-Url"] = f"/profiles/{profile_id}"
+            await send(message)
+
+        # Returns once the whole body was sent, so streamed reports are covered too
+        sampler = profiler.SamplingProfiler().start()
+        try:
+            await self.app(scope, receive, send_with_profile_headers)
+        finally:
+            sampler.stop()
+        await run_in_threadpool(profiler.save_profile, profile_id, sampler)
+
+app.add_middleware(ProfileMiddleware)
+
+# Heavy modules (torch/ultralytics, OpenCV, fpdf2, python-docx) are NOT imported here.
+# The model is loaded and warmed up in a background thread after startup, so the
+# worker starts serving non-inference requests right away. See load_model().
+MODEL_PATH = os.environ.get("YOLO_MODEL", "yolov8n.pt")
+# torch | onnx | openvino (exported once and cached next to the weights)
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "torch")
+INFERENCE_THREADS = int(os.environ.get("INFERENCE_THREADS", "0"))  # 0 = library default
+
+model = None
+model_backend = None
+model_ready = threading.Event()
+model_error = None
+_model_lock = threading.Lock()
+
+def load_model():
+    """Loads and warms up the YOLO model once. Safe to call from several threads."""
+    global model, model_backend, model_error
+    if model_ready.is_set():
+        return model
+    with _model_lock:
+        if model is None:
+            try:
+                import numpy as np
+
+                # Using yolov8n.pt as requested. It will download automatically on first use if not present.
+                # Warm-up: first inference initialises kernels/buffers
+                loaded, backend = load_yolo(
+                    MODEL_PATH,
+                    INFERENCE_BACKEND,
+                    INFERENCE_THREADS,
+                    warmup_image=np.zeros((640, 640, 3), dtype=np.uint8),
+                )
+                model = loaded
+                model_backend = backend
+                model_error = None
+                model_ready.set()
+            except Exception as e:
+                model_error = str(e)
+                print(f"ERROR: Failed to load model {MODEL_PATH}: {e}")
+                raise
+    return model
 
+def _warm_up():
+    # Preload the generator modules too, so the first report doesn't pay for the imports
+    try:
+        import pdf_generator  # noqa: F401
+        import docx_generator  # noqa: F401
+        load_model()
+    except Exception:
+        pass
+
+@app.on_event("startup")
+def start_background_warm_up():
+    threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    # TTL + quota sweeps of temp_uploads (see scratch.py); job retention is
+    # enforced on the same schedule so it also runs when no jobs are submitted
+    from jobs import job_manager
+
+    add_sweep_hook(job_manager.purge)
+    add_keep_hook(pending_job_asset_paths)
+    start_sweeper()
+
+UPLOAD_DIR = SCRATCH_DIR
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Finished job outputs, kept until downloaded / JOB_RETENTION_SECONDS
+JOB_OUTPUT_DIR = os.path.join(UPLOAD_DIR, "jobs")
+os.makedirs(JOB_OUTPUT_DIR, exist_ok=True)
+
+# Micro-batching: concurrent /crop calls are grouped into one YOLO call.
+# Needs INFERENCE_WORKERS >= batch size for batches to actually fill up.
+CROP_BATCH_SIZE = int(os.environ.get("CROP_BATCH_SIZE", "8"))
+CROP_BATCH_WAIT_MS = float(os.environ.get("CROP_BATCH_WAIT_MS", "5"))
+
+def detect_first_boxes(sources):
+    """
+    Runs one batched YOLO call. Returns, per source, the (x1, y1, x2, y2)
+    of the first detected box or None.
+    """
+    yolo = load_model()
+    with metrics.YOLO_SECONDS.time():
+        results = yolo(sources)
+    metrics.YOLO_IMAGES.inc(len(sources))
+    boxes = []
     for result in results:
         # Check if boxes are detected
         if result.boxes and len(result.boxes) > 0:
             # Get box with highest confidence (first one usually)
             box = result.boxes[0].xyxy[0].cpu().numpy()
-            x1, y1, x2, y2 = map(int, box)
-            
-            # Add margin (padding)
-            h, w, _ = img.shape
-            pad = int(min(h, w) * 0.05) # 5% padding
-            x1 = max(0, x1 - pad)
-            y1 = max(0, y1 - pad)
-            x2 = min(w, x2 + pad)
-            y2 = min(h, y2 + pad)
-            
-            # Crop
-            cropped_img = img[y1:y2, x1:x2]
-            
-            # Save
-            cv2.imwrite(output_path, cropped_img, [int(cv2.IMWRITE_JPEG_QUALITY), 100])
-            return True
+            boxes.append(tuple(map(int, box)))
+        else:
+            boxes.append(None)
+    return boxes
+
+crop_scheduler = BatchScheduler(detect_first_boxes, max_batch_size=CROP_BATCH_SIZE, max_wait_ms=CROP_BATCH_WAIT_MS, name="yolo-batch")
+
+CROP_JPEG_QUALITY = int(os.environ.get("CROP_JPEG_QUALITY", "100"))
+
+def ai_smart_crop(image_bytes):
+    """
+    Detects the first object using YOLOv8 and crops the image with a margin.
+    Works fully in memory: the bytes are decoded once and the same array
+    is used for detection and cropping.
+    Returns (jpeg_bytes, (x1, y1, x2, y2)) or (None, None) if nothing was detected.
+    """
+    import cv2
+    import numpy as np
+
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
+    
+    # Check if image loaded correctly
+    if img is None:
+        return None, None
+
+    box = crop_scheduler.predict(img)
+
+    if box is not None:
+        x1, y1, x2, y2 = box
+        
+        # Add margin (padding)
+        h, w, _ = img.shape
+        pad = int(min(h, w) * 0.05) # 5% padding
+        x1 = max(0, x1 - pad)
+        y1 = max(0, y1 - pad)
+        x2 = min(w, x2 + pad)
+        y2 = min(h, y2 + pad)
+        
+        # Crop
+        cropped_img = img[y1:y2, x1:x2]
+        
+        # Encode straight to bytes for the response
+        success, encoded = cv2.imencode('.jpg', cropped_img, [int(cv2.IMWRITE_JPEG_QUALITY), CROP_JPEG_QUALITY])
+        if success:
+            return encoded.tobytes(), (x1, y1, x2, y2)
             
-    # Fallback: copy original if no detection
-    # shutil.copy(image_path, output_path) 
-    return False
+    # No detection: caller falls back to the original image
+    return None, None
 
 @app.post("/crop")
 async def crop_image(file: UploadFile = File(...)):
-    filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-    file_path = os.path.join(UPLOAD_DIR, filename)
-    cropped_filename = f"cropped_{filename}"
-    cropped_path = os.path.join(UPLOAD_DIR, cropped_filename)
-
     try:
-        # Save uploaded file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Upload stays in memory, no temp files
+        data = await file.read()
         
-        # Process
-        success = ai_smart_crop(file_path, cropped_path)
+        # Process (YOLO + OpenCV run in the inference pool, off the event loop)
+        cropped, box = await inference_pool.run(ai_smart_crop, data)
         
-        if success:
-            return FileResponse(cropped_path, media_type="image/jpeg")
+        if cropped:
+            return Response(content=cropped, media_type="image/jpeg")
         else:
-            # If AI fails, return original or error? 
-            # User requirement: "Proceed". So maybe return original?
-            # User code said "False # Jika gagal deteksi". 
-            # I will return the original image if crop fails, but maybe with a header/flag?
-            # For now, let's just return the original if it fails to crop, 
-            # or maybe a 204 to let frontend handle it? 
-            # Let's return the original for simplicity so the flow continues.
-            return FileResponse(file_path, media_type="image/jpeg")
+            # If AI fails, return the original so the flow continues.
+            return Response(content=data, media_type="image/jpeg")
 
+    except PoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        # Clean up files? 
-        # In a real app we'd want to clean up. 
-        # For now, we can leave them or use a background task to delete after response.
-        # Since we return FileResponse, we can't delete immediately.
-        pass
 
 import base64
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional, Dict, Any
-from pdf_generator import create_multiset_pdf, fetch_drive_image
+from asset_store import save_asset, save_asset_stream, get_asset_path, is_asset_id, asset_path
 
 # ... existing imports ...
 
 # Pydantic Models for JSON Payload
 class UnitImages(BaseModel):
+    # Each field accepts a base64 data URL, a URL (Drive/http),
+    # or an asset ID returned by POST /assets
     front: Optional[str] = None
     back: Optional[str] = None
     right: Optional[str] = None
@@ -127,38 +283,155 @@ class ReportRequest(BaseModel):
     layout: Optional[Dict[str, Dict[str, float]]] = None # Nested dict for x,y,w,h
 
 def save_base64_image(data_url):
-    """Decodes base64 data_url and saves to a temp file. Returns the path."""
+    """Decodes base64 data_url and stores it in the asset store. Returns the asset ID."""
     if not data_url or "," not in data_url:
         return None
     
     try:
         header, encoded = data_url.split(",", 1)
         data = base64.b64decode(encoded)
-        extension = header.split(";")[0].split("/")[1]
-        
-        filename = f"{uuid.uuid4()}.{extension}"
-        filepath = os.path.join(UPLOAD_DIR, filename)
         
-        with open(filepath, "wb") as f:
-            f.write(data)
-        return filepath
+        # Identical bytes map to the same asset, so re-sent photos are not written again
+        return save_asset(data)
     except Exception as e:
         print(f"Error saving base64 image: {e}")
         return None
 
+# Multipart report submissions: max file parts per request
+MULTIPART_MAX_FILES = int(os.environ.get("MULTIPART_MAX_FILES", "1000"))
+FILE_REF_PREFIX = "file:"
+
+async def read_report_request(http_request: Request):
+    """
+    Parses a report submission, either as JSON (ReportRequest) or as multipart/form-data
+    with a `manifest` field holding the same JSON plus one binary part per photo.
+    In the manifest an image value "file:<part name>" points at a file part. File parts
+    are streamed into the asset store and replaced by their asset ID, so no base64.
+    """
+    content_type = http_request.headers.get("content-type", "")
+    try:
+        if not content_type.startswith("multipart/form-data"):
+            return ReportRequest.model_validate_json(await http_request.body())
+
+        async with http_request.form(max_files=MULTIPART_MAX_FILES) as form:
+            manifest = form.get("manifest")
+            if manifest is None:
+                raise HTTPException(status_code=400, detail="Missing manifest field")
+            if isinstance(manifest, FormFile):
+                manifest = await manifest.read()
+            data = json.loads(manifest)
+
+            # Starlette spools each part to a temp file; hash + copy it in chunks
+            assets = {}
+            for name, value in form.multi_items():
+                if isinstance(value, FormFile) and name != "manifest":
+                    assets[name] = await run_in_threadpool(save_asset_stream, value.file)
+
+        # Shape checks before the file: refs are replaced; the rest is left to ReportRequest
+        if not isinstance(data, dict):
+            raise HTTPException(status_code=400, detail="Invalid manifest: expected a JSON object")
+        units = data.get("units", [])
+        if not isinstance(units, list) or not all(isinstance(unit, dict) for unit in units):
+            raise HTTPException(status_code=400, detail="Invalid manifest: units must be a list of objects")
+        for unit in units:
+            images = unit.get("images") or {}
+            if not isinstance(images, dict):
+                raise HTTPException(status_code=400, detail="Invalid manifest: images must be an object")
+            for key, value in images.items():
+                if isinstance(value, str) and value.startswith(FILE_REF_PREFIX):
+                    part = value[len(FILE_REF_PREFIX):]
+                    if part not in assets:
+                        raise HTTPException(status_code=400, detail=f"Missing file part '{part}'")
+                    images[key] = assets[part]
+
+        return ReportRequest.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid manifest: {e}")
+
+@app.post("/assets")
+async def upload_asset(file: UploadFile = File(...)):
+    """
+    Stores an image once and returns its asset ID.
+    The ID can be used in UnitImages instead of a base64 data URL.
+    """
+    try:
+        # Hash + copy in chunks, off the event loop
+        asset_id = await run_in_threadpool(save_asset_stream, file.file)
+        return {"asset_id": asset_id, "size": os.path.getsize(get_asset_path(asset_id))}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.api_route("/assets/{asset_id}", methods=["GET", "HEAD"])
+def get_asset(asset_id: str):
+    """Lets the client check (HEAD) whether an asset is already stored before uploading it."""
+    path = get_asset_path(asset_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return FileResponse(path)
+
+async def _crop_one(index, data, name):
+    """Crops one image for /crop-batch and returns its NDJSON record."""
+    try:
+        cropped, box = await inference_pool.run(ai_smart_crop, data)
+        return {
+            "index": index,
+            "name": name,
+            "cropped": cropped is not None,
+            "box": list(box) if box else None,
+            "image": "data:image/jpeg;base64," + base64.b64encode(cropped or data).decode("ascii"),
+        }
+    except Exception as e:
+        return {"index": index, "name": name, "cropped": False, "box": None, "error": str(e)}
+
+@app.post("/crop-batch")
+async def crop_batch(files: List[UploadFile] = File(None), asset_ids: List[str] = Form(None)):
+    """
+    Crops many photos in one request: uploaded files and/or stored asset IDs.
+    All images go to the detector together (they get micro-batched) and results are
+    streamed back as NDJSON, one line per image in completion order:
+    {"index", "name", "cropped", "box": [x1, y1, x2, y2] | null, "image": data URL}
+    """
+    sources = []
+    for upload in files or []:
+        sources.append((await upload.read(), upload.filename))
+
+    for asset_id in asset_ids or []:
+        path = get_asset_path(asset_id)
+        if not path:
+            raise HTTPException(status_code=404, detail=f"Asset not found: {asset_id}")
+        with open(path, "rb") as f:
+            sources.append((f.read(), asset_id))
+
+    if not sources:
+        raise HTTPException(status_code=400, detail="No files or asset_ids given")
+
+    async def stream_results():
+        tasks = [asyncio.create_task(_crop_one(i, data, name)) for i, (data, name) in enumerate(sources)]
+        for finished in asyncio.as_completed(tasks):
+            record = await finished
+            yield json.dumps(record) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 from fastapi.responses import FileResponse, StreamingResponse
 # ... (existing imports)
-from pdf_generator import create_multiset_pdf, fetch_drive_image
 
 # ... (existing code)
 
 @app.get("/proxy-image")
 async def proxy_image(url: str):
     """
-    Proxies a Google Drive image to the frontend to bypass CORS for cropping.
+    Proxies a Google Drive image (or one from IMAGE_HTTP_ALLOWED_HOSTS) to the
+    frontend to bypass CORS for cropping.
     """
     try:
-        image_io = fetch_drive_image(url)
+        from image_sources import resolver
+
+        # Async fetch so previews don't block the event loop. Only remote sources:
+        # Drive and allowlisted hosts, never local files or other hosts
+        image_io = await resolver.fetch_async(url, remote_only=True)
         if not image_io:
             raise HTTPException(status_code=404, detail="Failed to fetch image from Drive")
         
@@ -170,104 +443,362 @@ async def proxy_image(url: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def check_assets(request):
+    """422 naming every asset ID in the request that is not in the asset store, so the client can re-upload them."""
+    from pdf_generator import IMAGE_KEYS
+
+    missing = []
+    for unit in request.units:
+        for key in IMAGE_KEYS:
+            value = getattr(unit.images, key)
+            if value and is_asset_id(value) and not get_asset_path(value) and value not in missing:
+                missing.append(value)
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Unknown asset IDs, upload them again: {', '.join(missing)}")
+
+def build_pdf_units(request):
+    """Turns a ReportRequest into generator units; base64 images are saved to the asset store."""
+    check_assets(request)
+    processed_units = []
+    
+    for unit in request.units:
+        unit_dict = {
+            "nopol": unit.nopol,
+            "bu": unit.bu,
+            "lokasi": unit.lokasi,
+            "images": {}
+        }
+        
+        # Map images
+        img_map = {
+            "front": unit.images.front,
+            "back": unit.images.back,
+            "right": unit.images.right,
+            "left": unit.images.left,
+            "stnk": unit.images.stnk,
+            "tax": unit.images.tax,
+            "kir": unit.images.kir,
+            "kir_card": unit.images.kir_card,
+        }
+        
+        for key, data_val in img_map.items():
+            if data_val:
+                # Already uploaded via /assets (resolved by image_sources at render time)
+                if is_asset_id(data_val):
+                    unit_dict["images"][key] = data_val
+                    continue
+
+                # Try to save as base64
+                asset_id = save_base64_image(data_val)
+                if asset_id:
+                    unit_dict["images"][key] = asset_id
+                else:
+                    # If not base64 (e.g. URL), keep original value
+                    unit_dict["images"][key] = data_val
+        
+        processed_units.append(unit_dict)
+    return processed_units
+
+def build_docx_data(request):
+    """Turns a ReportRequest into the dict create_multiset_docx expects."""
+    check_assets(request)
+    PROCESSED_DATA = {"units": [], "layout": request.layout}
+    
+    for unit in request.units:
+        unit_dict = {
+            "nopol": unit.nopol,
+            "bu": unit.bu,
+            "lokasi": unit.lokasi,
+            "images": {}
+        }
+        
+        img_map = {
+            "front": unit.images.front,
+            "back": unit.images.back,
+            "right": unit.images.right,
+            "left": unit.images.left,
+            "stnk": unit.images.stnk,
+            "tax": unit.images.tax,
+            "kir": unit.images.kir,
+            "kir_card": unit.images.kir_card,
+        }
+        
+        for key, data_val in img_map.items():
+            if data_val:
+                unit_dict["images"][key] = data_val
+        
+        PROCESSED_DATA["units"].append(unit_dict)
+    return PROCESSED_DATA
+
 @app.post("/generate-multiset")
-async def generate_multiset_report(request: ReportRequest):
+async def generate_multiset_report(http_request: Request, stream: bool = False, parallel: bool = False):
+    # JSON body or multipart manifest + files (see read_report_request)
+    request = await read_report_request(http_request)
     try:
-        # 1. Process Data & Save Images
-        processed_units = []
-        
-        for unit in request.units:
-            unit_dict = {
-                "nopol": unit.nopol,
-                "bu": unit.bu,
-                "lokasi": unit.lokasi,
-                "images": {}
-            }
-            
-            # Map images
-            img_map = {
-                "front": unit.images.front,
-                "back": unit.images.back,
-                "right": unit.images.right,
-                "left": unit.images.left,
-                "stnk": unit.images.stnk,
-                "tax": unit.images.tax,
-                "kir": unit.images.kir,
-                "kir_card": unit.images.kir_card,
-            }
-            
-            for key, data_val in img_map.items():
-                if data_val:
-                    # Try to save as base64
-                    saved_path = save_base64_image(data_val)
-                    if saved_path:
-                        unit_dict["images"][key] = saved_path
-                    else:
-                        # If not base64 (e.g. URL), keep original value
-                        unit_dict["images"][key] = data_val
-            
-            processed_units.append(unit_dict)
+        # 1. Process Data & Save Images (base64 decode + hash + write, off the event loop)
+        processed_units = await run_in_threadpool(build_pdf_units, request)
             
         # 2. Generate PDF
+        if stream:
+            # Large batches: send the PDF while it is rendered, in chunks of
+            # STREAM_CHUNK_UNITS units, instead of building it all in memory first.
+            # Rendered in the render pool, which counts it as one job until it ends
+            from pdf_stream import stream_multiset_pdf
+
+            return StreamingResponse(
+                render_pool.stream(stream_multiset_pdf(processed_units, request.layout)),
+                media_type="application/pdf",
+                headers={"Content-Disposition": 'attachment; filename="Asset_Report.pdf"'},
+            )
+
         pdf_filename = f"Report_Assets_{uuid.uuid4()}.pdf"
         output_path = os.path.join(UPLOAD_DIR, pdf_filename)
         
         # Pass layout config
-        create_multiset_pdf(processed_units, output_path, request.layout)
+        if parallel:
+            # Units split across PDF_SHARD_PROCESSES worker processes, parts merged in order
+            from pdf_shard import create_multiset_pdf_sharded as render_pdf
+        else:
+            from pdf_generator import create_multiset_pdf as render_pdf
+
+        # Rendering runs in the render pool so other requests keep being served
+        _, stats = await render_pool.run(render_pdf, processed_units, output_path, request.layout, return_stats=True)
         
-        return FileResponse(output_path, media_type="application/pdf", filename="Asset_Report.pdf")
+        # The file is only needed until it has been sent
+        return FileResponse(
+            output_path,
+            media_type="application/pdf",
+            filename="Asset_Report.pdf",
+            headers={"X-Image-Bytes-Saved": str(stats["image_bytes_saved"])},
+            background=BackgroundTask(remove_file, output_path),
+        )
 
+    except HTTPException:
+        raise
+    except PoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
-from docx_generator import create_multiset_docx
 import time
 
+DOCX_MEDIA_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
 @app.post("/generate-multiset-docx")
-async def generate_multiset_docx(request: ReportRequest):
+async def generate_multiset_docx(http_request: Request):
+    request = await read_report_request(http_request)
     try:
-        PROCESSED_DATA = {"units": [], "layout": request.layout}
-        
-        for unit in request.units:
-            unit_dict = {
-                "nopol": unit.nopol,
-                "bu": unit.bu,
-                "lokasi": unit.lokasi,
-                "images": {}
-            }
-            
-            img_map = {
-                "front": unit.images.front,
-                "back": unit.images.back,
-                "right": unit.images.right,
-                "left": unit.images.left,
-                "stnk": unit.images.stnk,
-                "tax": unit.images.tax,
-                "kir": unit.images.kir,
-                "kir_card": unit.images.kir_card,
-            }
-            
-            for key, data_val in img_map.items():
-                if data_val:
-                    unit_dict["images"][key] = data_val
-            
-            PROCESSED_DATA["units"].append(unit_dict)
+        PROCESSED_DATA = await run_in_threadpool(build_docx_data, request)
             
         timestamp = int(time.time())
         filename = f"ba_asset_multiset_{timestamp}.docx"
-        output_path = os.path.join(UPLOAD_DIR, filename)
+        # Unique on disk: concurrent requests in the same second must not share a file
+        output_path = os.path.join(UPLOAD_DIR, f"{uuid.uuid4()}_{filename}")
         
-        create_multiset_docx(PROCESSED_DATA, output_path)
+        from docx_generator import create_multiset_docx
+
+        await render_pool.run(create_multiset_docx, PROCESSED_DATA, output_path)
         
-        return FileResponse(output_path, media_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document', filename=filename)
+        return FileResponse(output_path, media_type=DOCX_MEDIA_TYPE, filename=filename, background=BackgroundTask(remove_file, output_path))
 
+    except HTTPException:
+        raise
+    except PoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/validate")
+async def validate_report(http_request: Request):
+    """
+    Completeness pre-check: the per-unit LENGKAP/KURANG summary of the report,
+    without rendering. Every image is probed concurrently (HEAD for Drive and
+    allowlisted hosts, stat for assets and configured local:// directories,
+    length for data URLs), nothing is downloaded. Any other reference (server
+    paths, other hosts) is never touched and reported as unsupported.
+    """
+    request = await read_report_request(http_request)
+    from pdf_generator import IMAGE_KEYS, completeness
+    from image_sources import resolver
+
+    start = time.perf_counter()
+    refs = [(i, key, getattr(unit.images, key)) for i, unit in enumerate(request.units) for key in IMAGE_KEYS]
+    supported = [ref for _, _, ref in refs if ref and resolver.source_for(ref) is not None]
+    probes = iter(await run_in_threadpool(resolver.probe_many, supported))
+
+    images = [{} for _ in request.units]
+    for i, key, ref in refs:
+        if not ref:
+            images[i][key] = {"exists": False, "source": None}
+        elif resolver.source_for(ref) is None:
+            images[i][key] = {"exists": False, "source": None, "error": "unsupported reference"}
+        else:
+            images[i][key] = next(probes)
+
+    units = []
+    for unit, unit_images in zip(request.units, images):
+        status, missing = completeness({key: probe["exists"] for key, probe in unit_images.items()})
+        units.append({
+            "nopol": unit.nopol,
+            "bu": unit.bu,
+            "lokasi": unit.lokasi,
+            "status": status,
+            "missing": missing,
+            "images": unit_images,
+        })
+
+    return {
+        "units": units,
+        "complete": sum(1 for u in units if u["status"] == "LENGKAP"),
+        "incomplete": sum(1 for u in units if u["status"] != "LENGKAP"),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+def unit_assets(units):
+    """Asset IDs referenced by processed report units."""
+    return {value for unit in units for value in unit["images"].values() if is_asset_id(value)}
+
+def pending_job_asset_paths():
+    # Photos of queued/running jobs must survive the scratch sweeper until they are rendered
+    from jobs import job_manager
+
+    return [asset_path(asset_id) for asset_id in job_manager.pending_assets()]
+
+@app.post("/jobs")
+async def submit_report_job(http_request: Request, format: str = "pdf"):
+    """
+    Queues a report (format=pdf|docx) in the background and returns its job ID.
+    Poll GET /jobs/{id} or subscribe to GET /jobs/{id}/events, then download.
+    """
+    from jobs import job_manager
+
+    request = await read_report_request(http_request)
+
+    if format == "pdf":
+        from pdf_generator import create_multiset_pdf
+
+        output_path = os.path.join(JOB_OUTPUT_DIR, f"Report_Assets_{uuid.uuid4()}.pdf")
+        units = await run_in_threadpool(build_pdf_units, request)
+        job = job_manager.submit(
+            "pdf", create_multiset_pdf, (units, output_path, request.layout),
+            len(request.units), output_path, "application/pdf", "Asset_Report.pdf", unit_assets(units),
+        )
+    elif format == "docx":
+        from docx_generator import create_multiset_docx
+
+        filename = f"ba_asset_multiset_{int(time.time())}.docx"
+        output_path = os.path.join(JOB_OUTPUT_DIR, f"{uuid.uuid4()}_{filename}")
+        data = await run_in_threadpool(build_docx_data, request)
+        job = job_manager.submit(
+            "docx", create_multiset_docx, (data, output_path),
+            len(request.units), output_path, DOCX_MEDIA_TYPE, filename, unit_assets(data["units"]),
+        )
+    else:
+        raise HTTPException(status_code=400, detail="format must be pdf or docx")
+
+    return job.to_dict()
+
+def _get_job(job_id):
+    from jobs import job_manager
+
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+@app.get("/jobs/{job_id}")
+def get_report_job(job_id: str):
+    return _get_job(job_id).to_dict()
+
+@app.get("/jobs/{job_id}/events")
+async def report_job_events(job_id: str):
+    """Server-Sent Events: one "progress" event per fetch/crop/render step, then "status" events."""
+    from jobs import FINISHED
+
+    job = _get_job(job_id)
+
+    async def event_stream():
+        seq = 0
+        while True:
+            finished = job.status in FINISHED
+            for event in job.events_since(seq):
+                seq = event["seq"] + 1
+                yield f"event: {event['type']}\nid: {event['seq']}\ndata: {json.dumps(event)}\n\n"
+            if finished:
+                break
+            await asyncio.sleep(0.2)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/jobs/{job_id}/download")
+def download_report_job(job_id: str):
+    from jobs import DONE
+
+    job = _get_job(job_id)
+    if job.status != DONE:
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    return FileResponse(job.output_path, media_type=job.media_type, filename=job.filename)
+
+@app.delete("/jobs/{job_id}")
+def cancel_report_job(job_id: str):
+    from jobs import job_manager
+
+    _get_job(job_id)
+    return job_manager.cancel(job_id).to_dict()
+
+@app.get("/cache-stats")
+def cache_stats():
+    """Hit/miss counters of the Drive download cache and the document-crop cache."""
+    from pdf_generator import drive_cache
+    from smart_crop import doc_crop_cache
+    return {"drive": drive_cache.stats(), "doc_crop": doc_crop_cache.stats()}
+
+@app.get("/scratch-stats")
+def scratch_stats():
+    """Disk usage of temp_uploads and the sweeper's deletion counters."""
+    return disk_usage()
+
+@app.get("/pool-stats")
+def executor_stats():
+    """Queue depth and wait times of the inference and render pools."""
+    stats = pool_stats()
+    stats["crop_batching"] = crop_scheduler.stats()
+    from jobs import job_manager
+    stats["jobs"] = job_manager.stats()
+    return stats
+
+@app.get("/profiles/{profile_id}")
+def download_profile(profile_id: str):
+    """A stored request profile in collapsed-stack format (flamegraph.pl, speedscope)."""
+    path = profiler.get_profile_path(profile_id)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"profile_{profile_id}.folded")
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/")
 def read_root():
-    return {"status": "running", "model": "YOLOv8n"}
+    # live: the process serves requests. ready: the model is loaded and warmed up.
+    return {
+        "status": "running",
+        "model": "YOLOv8n",
+        "backend": model_backend,
+        "live": True,
+        "ready": model_ready.is_set(),
+        "model_error": model_error,
+    }
+
+@app.get("/ready")
+def readiness():
+    """Readiness probe: 503 until the model has been loaded."""
+    if not model_ready.is_set():
+        raise HTTPException(status_code=503, detail=model_error or "Model loading")
+    return {"ready": True}
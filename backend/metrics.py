@@ -0,0 +1,199 @@
+import time
+import threading
+from contextlib import contextmanager
+
+# Process-wide counters and histograms, exposed by GET /metrics in the
+# Prometheus text format (version 0.0.4). Kept dependency-free on purpose:
+# the metrics are simple and the set is fixed, see the definitions at the end.
+#
+# Note: PDF shards render in separate processes (pdf_shard), their per-unit
+# render times are not included here; the merged report's size and duration are.
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(11))  # 1 KB .. 1 GB
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_samples(items))
+        return lines
+
+    def _render_samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=SECONDS_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts (not cumulative), sum, count]
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def _render_samples(self, items):
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    for metric in _registry:
+        metric.reset()
+
+
+# --- Drive ---
+DRIVE_FETCHES = Counter(
+    "drive_fetch_total", "Drive download attempts by path (thumbnail, fallback) and outcome (ok, error).",
+    ["path", "outcome"])
+DRIVE_FETCH_SECONDS = Histogram(
+    "drive_fetch_seconds", "Duration of a Drive download attempt by path (thumbnail, fallback).", ["path"])
+DRIVE_BYTES = Counter(
+    "drive_downloaded_bytes_total", "Image bytes downloaded from Drive by path (thumbnail, fallback).", ["path"])
+DRIVE_CACHE = Counter(
+    "drive_cache_total", "Drive image cache lookups by result (hit, miss).", ["result"])
+
+# --- Crop ---
+DOC_CROP_CACHE = Counter(
+    "smart_doc_crop_cache_total", "smart_doc_crop result cache lookups by result (hit, miss).", ["result"])
+DOC_CROP_SECONDS = Histogram(
+    "smart_doc_crop_seconds", "Document detection + warp time on a cache miss.")
+YOLO_SECONDS = Histogram(
+    "yolo_inference_seconds", "Duration of one (batched) YOLO inference call.")
+YOLO_IMAGES = Counter(
+    "yolo_inference_images_total", "Images passed through YOLO inference.")
+
+# --- Reports ---
+IMAGE_PREPARE_SECONDS = Histogram(
+    "report_image_prepare_seconds", "Fetch + crop + resample time of one PDF report image.")
+UNIT_RENDER_SECONDS = Histogram(
+    "report_unit_render_seconds", "Layout time of one report unit, images already fetched, by format.", ["format"])
+REPORT_SECONDS = Histogram(
+    "report_seconds", "Total time to produce a report by format.", ["format"])
+REPORT_BYTES = Histogram(
+    "report_output_bytes", "Size of a produced report by format.", ["format"], buckets=BYTES_BUCKETS)
+
+# --- HTTP ---
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled.")
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time until the response starts, by method, route and status.",
+    ["method", "route", "status"])
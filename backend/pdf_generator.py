@@ -1,7 +1,11 @@
 import os
 import io
 import re
-import requests
+import time
+import asyncio
+import itertools
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from fpdf import FPDF
 from datetime import datetime
 from PIL import Image
@@ -9,48 +13,127 @@ import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 from smart_crop import smart_doc_crop
+from cache import MemoryLRU, DiskCache, TieredCache
+from http_client import get_session, get_async_client
+from image_resample import downsample_to_box
+from font_registry import font_registry
+from image_sources import resolver
+import metrics
+
+# Overridable so tests/benchmarks can point at a local stand-in server
+DRIVE_BASE_URL = os.environ.get("DRIVE_BASE_URL", "https://drive.google.com")
+
+# Shared cache for Drive downloads, keyed by Drive file ID.
+# The same link is fetched for /proxy-image previews, the PDF and the DOCX.
+DRIVE_CACHE_DIR = os.environ.get("DRIVE_CACHE_DIR", os.path.join("temp_uploads", "drive_cache"))
+DRIVE_CACHE_MEMORY_BYTES = int(os.environ.get("DRIVE_CACHE_MEMORY_MB", "256")) * 1024 * 1024
+DRIVE_CACHE_DISK_BYTES = int(os.environ.get("DRIVE_CACHE_DISK_MB", "2048")) * 1024 * 1024
+DRIVE_CACHE_TTL = int(os.environ.get("DRIVE_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+# Prefetch stage: images are fetched/cropped/decoded in a worker pool ahead of the renderer.
+# PDF_PREFETCH_WINDOW = how many units may be in flight (0 = all units at once).
+PREFETCH_WORKERS = int(os.environ.get("PDF_PREFETCH_WORKERS", "16"))
+PREFETCH_WINDOW = int(os.environ.get("PDF_PREFETCH_WINDOW", "32"))
+
+# Embedded images are resampled to the pixel size their box needs at this DPI
+# and re-encoded as JPEG. PDF_IMAGE_DPI=0 embeds the original bytes.
+PDF_IMAGE_DPI = int(os.environ.get("PDF_IMAGE_DPI", "200"))
+PDF_JPEG_QUALITY = int(os.environ.get("PDF_JPEG_QUALITY", "85"))
+
+# Page 1 document boxes (mm)
+DOC_FULL_W = 190
+DOC_FULL_H = 85
+KIR_GAP = 5
+KIR_W = (DOC_FULL_W - KIR_GAP) / 2
+KIR_H = 65
+
+IMAGE_KEYS = ['stnk', 'tax', 'kir', 'kir_card', 'front', 'back', 'right', 'left']
+# Documents get the perspective smart crop
+DOC_CROP_KEYS = ('stnk', 'tax', 'kir', 'kir_card')
+
+drive_cache = TieredCache(
+    MemoryLRU(DRIVE_CACHE_MEMORY_BYTES),
+    DiskCache(DRIVE_CACHE_DIR, DRIVE_CACHE_DISK_BYTES, DRIVE_CACHE_TTL),
+)
 
 class MultiSetPDF(FPDF):
+    # Pages rendered before this document (when the report is built in chunks)
+    page_offset = 0
+
     def header(self):
         pass
 
     def footer(self):
         self.set_y(-15)
         self.set_font('Helvetica', 'I', 8)
-        self.cell(0, 10, f'Halaman {self.page_no()}', 0, 0, 'C')
+        self.cell(0, 10, f'Halaman {self.page_no() + self.page_offset}', 0, 0, 'C')
+
+def extract_drive_file_id(url):
+    """
+    Extracts the File ID from a Google Drive URL.
+    Supports formats: /file/d/ID/view and open?id=ID
+    """
+    if not url:
+        return None
+
+    match_id = re.search(r'id=([a-zA-Z0-9_-]+)', url)
+    match_d = re.search(r'/d/([a-zA-Z0-9_-]+)', url)
+
+    if match_id:
+        return match_id.group(1)
+    elif match_d:
+        return match_d.group(1)
+    return None
 
 def fetch_drive_image(url):
     """
     Downloads image from Google Drive URL to BytesIO object.
-    Supports formats: /file/d/ID/view and open?id=ID
+    Results are cached by file ID (memory + disk), see drive_cache.
     """
     if not url: 
         return None
 
-    try:
-        # Regex to extract File ID
-        match_id = re.search(r'id=([a-zA-Z0-9_-]+)', url)
-        match_d = re.search(r'/d/([a-zA-Z0-9_-]+)', url)
-
-        file_id = None
-        if match_id:
-            file_id = match_id.group(1)
-        elif match_d:
-            file_id = match_d.group(1)
+    file_id = extract_drive_file_id(url)
+    if not file_id:
+        return None
 
-        if not file_id:
-            return None 
+    cached = drive_cache.get(file_id)
+    metrics.DRIVE_CACHE.inc(result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return io.BytesIO(cached)
 
-        if not file_id:
-            return None 
+    data = _download_drive_file(url, file_id)
+    if data is None:
+        return None
 
-        session = requests.Session()
-        session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    drive_cache.put(file_id, data)
+    return io.BytesIO(data)
+
+def _get_confirm_token(response):
+    # Large files answer with a virus-scan warning; the token is in a cookie
+    for key, value in response.cookies.items():
+        if key.startswith('download_warning'):
+            return value
+    return None
+
+def _record_drive_fetch(path, start, data=None):
+    """Records one Drive download attempt (thumbnail or fallback). Returns data."""
+    metrics.DRIVE_FETCHES.inc(path=path, outcome="ok" if data is not None else "error")
+    metrics.DRIVE_FETCH_SECONDS.observe(time.perf_counter() - start, path=path)
+    if data is not None:
+        metrics.DRIVE_BYTES.inc(len(data), path=path)
+    return data
+
+def _download_drive_file(url, file_id, session=None):
+    """Downloads the raw bytes of a Drive file. Returns None on failure."""
+    start = time.perf_counter()
+    try:
+        # Shared keep-alive session, connections are reused across images
+        if session is None:
+            session = get_session()
 
         # --- OPTIMIZATION: Try Thumbnail API First (sz=s3000) ---
-        thumbnail_url = f'https://drive.google.com/thumbnail?id={file_id}&sz=s3000'
+        thumbnail_url = f'{DRIVE_BASE_URL}/thumbnail?id={file_id}&sz=s3000'
         # console.log equivalent for python backend
         print(f"INFO: Trying thumbnail for {file_id}")
         
@@ -63,30 +146,27 @@ def fetch_drive_image(url):
             # We strictly check Content-Type
             ct = thumb_resp.headers.get('Content-Type', '')
             if thumb_resp.status_code == 200 and ct.startswith('image/'):
-                 return io.BytesIO(thumb_resp.content)
+                 return _record_drive_fetch("thumbnail", start, thumb_resp.content)
             else:
+                 _record_drive_fetch("thumbnail", start)
                  print(f"WARN: Thumbnail fetch failed (Status: {thumb_resp.status_code}, Type: {ct}). Falling back to original.")
         except Exception as e:
             # This catch block ensures we proceed to fallback even if thumbnail request explodes
+            _record_drive_fetch("thumbnail", start)
             print(f"WARN: Thumbnail API error ({e}). Falling back to original.")
 
         # --- FALLBACK: Use Original Download URL ---
-        download_url = f'https://drive.google.com/uc?export=download&id={file_id}'
+        start = time.perf_counter()
+        download_url = f'{DRIVE_BASE_URL}/uc?export=download&id={file_id}'
         # Increase timeout for slow connections
-        response = session.get(download_url, stream=True, timeout=45, verify=False)
-        
-        # Helper to check for confirmation token
-        def get_confirm_token(response):
-            for key, value in response.cookies.items():
-                if key.startswith('download_warning'):
-                    return value
-            return None
+        # (no stream=True: the body is read anyway and the connection must go back to the pool)
+        response = session.get(download_url, timeout=45, verify=False)
 
-        token = get_confirm_token(response)
+        token = _get_confirm_token(response)
 
         if token:
             params = {'id': file_id, 'confirm': token}
-            response = session.get(download_url, params=params, stream=True, timeout=15, verify=False)
+            response = session.get(download_url, params=params, timeout=15, verify=False)
             
         # Check Content-Type
         content_type = response.headers.get('Content-Type', '')
@@ -102,7 +182,7 @@ def fetch_drive_image(url):
              if match_confirm:
                  confirm_code = match_confirm.group(1)
                  params = {'id': file_id, 'confirm': confirm_code}
-                 response = session.get(download_url, params=params, stream=True, timeout=15, verify=False)
+                 response = session.get(download_url, params=params, timeout=15, verify=False)
                  content_type = response.headers.get('Content-Type', '')
 
         if 'image' not in content_type and 'application/octet-stream' not in content_type:
@@ -110,51 +190,203 @@ def fetch_drive_image(url):
             # We continue anyway, as sometimes headers are wrong, but PIL will fail if it's not bytes.
             
         response.raise_for_status()
-        return io.BytesIO(response.content)
+
+        if 'text/html' in content_type:
+            # Login / error page, not an image. Don't let it into the cache.
+            print(f"WARN: Drive returned HTML instead of image for {url}")
+            return _record_drive_fetch("fallback", start)
+
+        return _record_drive_fetch("fallback", start, response.content)
 
     except Exception as e:
         print(f"Failed to download drive image {url}: {e}")
-        return None
+        return _record_drive_fetch("fallback", start)
 
-def fit_and_center_image(pdf, img_path, x, y, w, h, auto_crop=False):
+async def fetch_drive_image_async(url):
     """
-    Fits an image into a box defined by x, y, w, h while maintaining aspect ratio
-    and centering it. Handles local paths and Google Drive URLs.
+    Async version of fetch_drive_image for use inside async endpoints.
+    Same cache, same thumbnail-then-fallback logic, but non-blocking I/O.
     """
-    if not img_path:
-        # Draw placeholder
-        pdf.set_xy(x, y + h/2 - 5)
-        # Using Helvetica for error text to be safe.
-        pdf.set_font("Helvetica", "I", 8)
-        pdf.cell(w, 10, "[No Image]", align='C')
-        return
+    if not url:
+        return None
 
+    file_id = extract_drive_file_id(url)
+    if not file_id:
+        return None
+
+    # Disk tier may touch the filesystem, keep it off the event loop
+    cached = await asyncio.to_thread(drive_cache.get, file_id)
+    metrics.DRIVE_CACHE.inc(result="hit" if cached is not None else "miss")
+    if cached is not None:
+        return io.BytesIO(cached)
+
+    data = await _download_drive_file_async(url, file_id)
+    if data is None:
+        return None
+
+    await asyncio.to_thread(drive_cache.put, file_id, data)
+    return io.BytesIO(data)
+
+async def _download_drive_file_async(url, file_id):
+    client = get_async_client()
+    start = time.perf_counter()
     try:
-        image_source = img_path
-        
-        # Check if it is a Google Drive URL
-        if isinstance(img_path, str) and ('drive.google.com' in img_path):
-            drive_img_data = fetch_drive_image(img_path)
-            if drive_img_data:
-                image_source = drive_img_data
+        thumbnail_url = f'{DRIVE_BASE_URL}/thumbnail?id={file_id}&sz=s3000'
+        print(f"INFO: Trying thumbnail for {file_id}")
+
+        try:
+            thumb_resp = await client.get(thumbnail_url, timeout=10)
+            ct = thumb_resp.headers.get('Content-Type', '')
+            if thumb_resp.status_code == 200 and ct.startswith('image/'):
+                return _record_drive_fetch("thumbnail", start, thumb_resp.content)
             else:
-                 raise Exception("Failed to download or invalid Drive link")
+                _record_drive_fetch("thumbnail", start)
+                print(f"WARN: Thumbnail fetch failed (Status: {thumb_resp.status_code}, Type: {ct}). Falling back to original.")
+        except Exception as e:
+            _record_drive_fetch("thumbnail", start)
+            print(f"WARN: Thumbnail API error ({e}). Falling back to original.")
+
+        start = time.perf_counter()
+        download_url = f'{DRIVE_BASE_URL}/uc?export=download&id={file_id}'
+        response = await client.get(download_url, timeout=45)
+
+        token = _get_confirm_token(response)
+        if token:
+            response = await client.get(download_url, params={'id': file_id, 'confirm': token}, timeout=15)
+
+        content_type = response.headers.get('Content-Type', '')
+        if 'text/html' in content_type:
+            match_confirm = re.search(r'confirm=([a-zA-Z0-9_-]+)', response.text)
+            if match_confirm:
+                params = {'id': file_id, 'confirm': match_confirm.group(1)}
+                response = await client.get(download_url, params=params, timeout=15)
+                content_type = response.headers.get('Content-Type', '')
+
+        response.raise_for_status()
+
+        if 'text/html' in content_type:
+            print(f"WARN: Drive returned HTML instead of image for {url}")
+            return _record_drive_fetch("fallback", start)
+
+        return _record_drive_fetch("fallback", start, response.content)
+
+    except Exception as e:
+        print(f"Failed to download drive image {url}: {e}")
+        return _record_drive_fetch("fallback", start)
+
+def prepare_image(img_path, auto_crop=False, box=None, on_stage=None):
+    """
+    Resolves an image reference (any image_sources reference) into a ready buffer:
+    downloads, applies smart crop if requested, resamples to the box size
+    (box = (w_mm, h_mm), see PDF_IMAGE_DPI) and reads the dimensions.
+    on_stage(stage) is called after "fetch" and "crop" (progress reporting).
+    Returns (BytesIO, width, height, original_bytes, embedded_bytes). Raises on failure.
+    """
+    with metrics.IMAGE_PREPARE_SECONDS.time():
+        if isinstance(img_path, str):
+            # Drive, HTTP, data URL, asset ID or local/NFS file, see image_sources
+            image_source = resolver.fetch(img_path)
+            if not image_source:
+                source = resolver.source_for(img_path)
+                if source is not None and source.name == "drive":
+                    raise Exception("Failed to download or invalid Drive link")
+                raise Exception(f"Image not found: {img_path[:100]}")
+        else:
+            # Already a file-like object
+            image_source = img_path
+
+        if on_stage:
+            on_stage("fetch")
 
         # --- SMART CROP LOGIC ---
         if auto_crop:
-            # If it's a file path, read bytes first
-            if isinstance(image_source, str):
-                with open(image_source, 'rb') as f:
-                    import io
-                    image_source = io.BytesIO(f.read())
-            
-            # Apply Smart Crop
             image_source = smart_doc_crop(image_source)
+            if on_stage:
+                on_stage("crop")
+
+        # --- DOWNSAMPLE TO BOX ---
+        if box and PDF_IMAGE_DPI > 0:
+            return downsample_to_box(image_source, box[0], box[1], PDF_IMAGE_DPI, PDF_JPEG_QUALITY)
 
         # Get image dimensions using Pillow
-        # Image.open handles both file paths and file-like objects (BytesIO)
         with Image.open(image_source) as img:
             img_w, img_h = img.size
+        image_source.seek(0)
+
+        size = image_source.getbuffer().nbytes
+        return image_source, img_w, img_h, size, size
+
+def _future_result(future):
+    # Errors are handed to the renderer, which draws the error placeholder
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+def prefetch_unit_images(units, max_workers=None, window=None, boxes=None, progress=None):
+    """
+    Prefetch stage for the renderer. Resolves the images of all units concurrently
+    in a bounded thread pool and yields, for each unit in order, a dict
+    {image_key: prepare_image() result or Exception}.
+    `boxes` maps image key -> (w_mm, h_mm) of its layout box, for downsampling.
+    At most `window` units are in flight, so memory stays bounded for big batches.
+    progress(stage, unit_index, image_key) is called from the worker threads.
+    """
+    max_workers = max_workers or PREFETCH_WORKERS
+    boxes = boxes or {}
+    window = PREFETCH_WINDOW if window is None else window
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+    pending = deque()
+
+    def submit(index, unit):
+        images = unit.get('images', {}) or {}
+        futures = {}
+        for key in IMAGE_KEYS:
+            ref = images.get(key)
+            if ref:
+                on_stage = None
+                if progress:
+                    on_stage = lambda stage, index=index, key=key: progress(stage, index, key)
+                futures[key] = executor.submit(prepare_image, ref, key in DOC_CROP_KEYS, boxes.get(key), on_stage)
+        pending.append(futures)
+
+    try:
+        unit_iter = enumerate(units)
+        for unit in (unit_iter if window <= 0 else itertools.islice(unit_iter, window)):
+            submit(*unit)
+
+        while pending:
+            futures = pending.popleft()
+            next_unit = next(unit_iter, None)
+            if next_unit is not None:
+                submit(*next_unit)
+            yield {key: _future_result(f) for key, f in futures.items()}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def fit_and_center_image(pdf, img_path, x, y, w, h, auto_crop=False, prepared=None):
+    """
+    Fits an image into a box defined by x, y, w, h while maintaining aspect ratio
+    and centering it. img_path is an image_sources reference or a file-like object.
+    `prepared` is the prefetched prepare_image() result for img_path, if any.
+    Returns True if the image was drawn, False if a placeholder was drawn instead.
+    """
+    if not img_path:
+        # Draw placeholder
+        pdf.set_xy(x, y + h/2 - 5)
+        # Using Helvetica for error text to be safe.
+        pdf.set_font("Helvetica", "I", 8)
+        pdf.cell(w, 10, "[No Image]", align='C')
+        return False
+
+    try:
+        if prepared is None:
+            prepared = prepare_image(img_path, auto_crop, (w, h))
+        if isinstance(prepared, Exception):
+            raise prepared
+
+        image_source, img_w, img_h = prepared[:3]
         
         # Calculate aspect ratios
         ratio_w = w / img_w
@@ -169,54 +401,33 @@ def fit_and_center_image(pdf, img_path, x, y, w, h, auto_crop=False):
         offset_y = (h - new_h) / 2
         
         # Draw image
-        # fpdf.image() also accepts BytesIO objects for 'name' argument if type is specified 
-        # or it can infer from BytesIO content if we are lucky, but safest to pass the stream or path.
-        # For BytesIO, FPDF2 recommends specifying a name or format.
-        # However, passing the PIL image object directly is often supported or we pass the stream.
-        # Let's try passing the stream/path directly as we did for local files.
-        # Note: formatting might be tricky for FPDF with BytesIO without a name.
-        # Let's use the image_source directly.
+        # fpdf2 accepts the BytesIO stream directly
         pdf.image(image_source, x=x + offset_x, y=y + offset_y, w=new_w, h=new_h)
+        return True
         
     except Exception as e:
         print(f"Error scaling image {str(img_path)[:50]}...: {e}")
         pdf.set_xy(x, y + h/2 - 5)
         pdf.set_font("Helvetica", "I", 8)
         pdf.cell(w, 10, "[Error/Link]", align='C')
+        return False
 
-def create_multiset_pdf(units, output_path, layout_config=None):
+def new_multiset_pdf(page_offset=0):
+    """Creates the PDF object with fonts loaded. Returns (pdf, main_font)."""
     pdf = MultiSetPDF()
+    pdf.page_offset = page_offset
     pdf.set_auto_page_break(auto=True, margin=15)
     
-    # Add Calibri Font (Try Windows path first, else fallback)
-    main_font = "Helvetica"
-    try:
-        font_paths = {
-            "": ["calibri.ttf", r"C:\Windows\Fonts\calibri.ttf"],
-            "B": ["calibrib.ttf", r"C:\Windows\Fonts\calibrib.ttf"],
-            "I": ["calibrii.ttf", r"C:\Windows\Fonts\calibrii.ttf"]
-        }
-        
-        success_count = 0
-        for style, paths in font_paths.items():
-            found = False
-            for path in paths:
-                if os.path.exists(path):
-                    pdf.add_font("Calibri", style, path, uni=True)
-                    found = True
-                    break
-            if found:
-                success_count += 1
-                
-        if success_count == 3:
-            main_font = "Calibri"
-        else:
-             print("Warning: Calibri font not fully found. Falling back to Helvetica.")
-             
-    except Exception as e:
-        print(f"Warning: Could not load Calibri font, falling back to Helvetica. Error: {e}")
-        main_font = "Helvetica"
+    # Calibri (or the metric-compatible Carlito) is parsed once per process, see font_registry
+    main_font = font_registry.install(pdf)
+
+    return pdf, main_font
 
+def resolve_layout(layout_config=None):
+    """
+    Merges the user layout with the defaults.
+    Returns (layout, boxes) where boxes maps image key -> (w_mm, h_mm).
+    """
     # Default Layout Configuration
     default_layout = {
         'front': {'x': 10, 'y': 50, 'w': 90, 'h': 80},
@@ -232,126 +443,155 @@ def create_multiset_pdf(units, output_path, layout_config=None):
             if key in layout and isinstance(conf, dict):
                 layout[key].update(conf)
 
-    processed_summary = []
+    # Box size per image key, so images are resampled to what the layout needs
+    boxes = {
+        'stnk': (DOC_FULL_W, DOC_FULL_H),
+        'tax': (DOC_FULL_W, DOC_FULL_H),
+        'kir': (KIR_W, KIR_H),
+        'kir_card': (KIR_W, KIR_H),
+    }
+    for key in ['front', 'back', 'right', 'left']:
+        conf = layout.get(key, {})
+        boxes[key] = (conf.get('w', 90), conf.get('h', 80))
 
-    for unit in units:
-        nopol = unit.get('nopol', 'UNKNOWN')
-        bu = unit.get('bu', '')
-        location = unit.get('lokasi', '')
-        
-        # Additional fields
-        merk = unit.get('merk', '-')
-        tipe = unit.get('tipe', '-')
-        no_rangka = unit.get('no_rangka', '-')
-        no_mesin = unit.get('no_mesin', '-')
-        tahun = unit.get('tahun', '-')
-        user_name = unit.get('user', '-')
-        
-        # Header Title Format
-        header_title = f"BU : {bu} - {location} - {nopol}".upper()
-
-        # ==========================================
-        # HALAMAN 1: DOKUMEN (Moved from Page 3)
-        # ==========================================
-        pdf.add_page()
-        pdf.set_font(main_font, "B", 11)
-        pdf.cell(0, 10, header_title, ln=True, align='L')
-        pdf.ln(2)
-        
-        # 1. STNK (Full Width)
-        stnk_y = 30
-        full_w = 190
-        full_h = 85
-        center_x = (210 - full_w) / 2
-        
-        # Draw STNK
-        pdf.set_xy(center_x, stnk_y - 6)
-        pdf.set_font(main_font, "B", 10)
-        pdf.cell(full_w, 6, "FOTO STNK (SURAT TANDA NOMOR KENDARAAN) :", ln=False, align='L')
-        pdf.rect(center_x, stnk_y, full_w, full_h)
-        fit_and_center_image(pdf, unit.get('images', {}).get('stnk'), center_x, stnk_y, full_w, full_h, auto_crop=True)
-        
-        # 2. PAJAK (Full Width)
-        pajak_y = stnk_y + full_h + 8
-        pdf.set_xy(center_x, pajak_y - 6)
-        pdf.set_font(main_font, "B", 10)
-        pdf.cell(full_w, 6, "FOTO LEMBAR PAJAK :", ln=False, align='L')
-        pdf.rect(center_x, pajak_y, full_w, full_h)
-        fit_and_center_image(pdf, unit.get('images', {}).get('tax'), center_x, pajak_y, full_w, full_h, auto_crop=True)
-        
-        # 3. KIR (Split: Left = Paper, Right = Card)
-        kir_y = pajak_y + full_h + 10
-        half_w = (full_w - 5) / 2 # 5mm gap
-        kir_h = 65 # Height for KIR
+    return layout, boxes
+
+def add_prefetch_stats(stats, prepared):
+    for result in prepared.values():
+        if not isinstance(result, Exception):
+            stats["images"] += 1
+            stats["image_bytes_original"] += result[3]
+            stats["image_bytes_embedded"] += result[4]
+
+def render_unit(pdf, main_font, unit, prepared, layout):
+    """
+    Draws the two pages of one unit (documents + photos).
+    Returns the unit's row for the summary page.
+    """
+    start = time.perf_counter()
+    # image key -> whether the image made it into the PDF, for the summary
+    placed = {}
+    nopol = unit.get('nopol', 'UNKNOWN')
+    bu = unit.get('bu', '')
+    location = unit.get('lokasi', '')
+    
+    # Additional fields
+    merk = unit.get('merk', '-')
+    tipe = unit.get('tipe', '-')
+    no_rangka = unit.get('no_rangka', '-')
+    no_mesin = unit.get('no_mesin', '-')
+    tahun = unit.get('tahun', '-')
+    user_name = unit.get('user', '-')
+    
+    # Header Title Format
+    header_title = f"BU : {bu} - {location} - {nopol}".upper()
+
+    # ==========================================
+    # HALAMAN 1: DOKUMEN (Moved from Page 3)
+    # ==========================================
+    pdf.add_page()
+    pdf.set_font(main_font, "B", 11)
+    pdf.cell(0, 10, header_title, ln=True, align='L')
+    pdf.ln(2)
+    
+    # 1. STNK (Full Width)
+    stnk_y = 30
+    full_w = DOC_FULL_W
+    full_h = DOC_FULL_H
+    center_x = (210 - full_w) / 2
+    
+    # Draw STNK
+    pdf.set_xy(center_x, stnk_y - 6)
+    pdf.set_font(main_font, "B", 10)
+    pdf.cell(full_w, 6, "FOTO STNK (SURAT TANDA NOMOR KENDARAAN) :", ln=False, align='L')
+    pdf.rect(center_x, stnk_y, full_w, full_h)
+    placed['stnk'] = fit_and_center_image(pdf, unit.get('images', {}).get('stnk'), center_x, stnk_y, full_w, full_h, auto_crop=True, prepared=prepared.get('stnk'))
+    
+    # 2. PAJAK (Full Width)
+    pajak_y = stnk_y + full_h + 8
+    pdf.set_xy(center_x, pajak_y - 6)
+    pdf.set_font(main_font, "B", 10)
+    pdf.cell(full_w, 6, "FOTO LEMBAR PAJAK :", ln=False, align='L')
+    pdf.rect(center_x, pajak_y, full_w, full_h)
+    placed['tax'] = fit_and_center_image(pdf, unit.get('images', {}).get('tax'), center_x, pajak_y, full_w, full_h, auto_crop=True, prepared=prepared.get('tax'))
+    
+    # 3. KIR (Split: Left = Paper, Right = Card)
+    kir_y = pajak_y + full_h + 10
+    half_w = KIR_W # (190 - 5mm gap) / 2
+    kir_h = KIR_H # Height for KIR
+    
+    # Left: Paper KIR
+    left_x = center_x
+    pdf.set_xy(left_x, kir_y - 6)
+    pdf.set_font(main_font, "B", 10)
+    pdf.cell(half_w, 6, "FOTO LEMBAR KIR :", ln=False, align='L')
+    pdf.rect(left_x, kir_y, half_w, kir_h)
+    placed['kir'] = fit_and_center_image(pdf, unit.get('images', {}).get('kir'), left_x, kir_y, half_w, kir_h, auto_crop=True, prepared=prepared.get('kir'))
+    
+    # Right: Card KIR
+    right_x = left_x + half_w + KIR_GAP
+    pdf.set_xy(right_x, kir_y - 6)
+    pdf.set_font(main_font, "B", 10)
+    pdf.cell(half_w, 6, "FOTO KARTU KIR :", ln=False, align='L')
+    pdf.rect(right_x, kir_y, half_w, kir_h)
+    placed['kir_card'] = fit_and_center_image(pdf, unit.get('images', {}).get('kir_card'), right_x, kir_y, half_w, kir_h, auto_crop=True, prepared=prepared.get('kir_card'))
+
+
+    # ==========================================
+    # HALAMAN 2: LAMPIRAN FOTO FISIK (Moved from Page 2)
+    # ==========================================
+    pdf.add_page()
+    pdf.set_font(main_font, "B", 11)
+    pdf.cell(0, 10, header_title, ln=True, align='L')
+    pdf.ln(5)
+    
+    photo_items = [
+        ('TAMPAK DEPAN', 'front'),
+        ('TAMPAK BELAKANG', 'back'),
+        ('TAMPAK SAMPING KANAN', 'right'),
+        ('TAMPAK SAMPING KIRI', 'left')
+    ]
+    
+    for label, key in photo_items:
+        conf = layout.get(key, {})
+        x, y, w, h = conf.get('x', 0), conf.get('y', 0), conf.get('w', 90), conf.get('h', 80)
         
-        # Left: Paper KIR
-        left_x = center_x
-        pdf.set_xy(left_x, kir_y - 6)
-        pdf.set_font(main_font, "B", 10)
-        pdf.cell(half_w, 6, "FOTO LEMBAR KIR :", ln=False, align='L')
-        pdf.rect(left_x, kir_y, half_w, kir_h)
-        fit_and_center_image(pdf, unit.get('images', {}).get('kir'), left_x, kir_y, half_w, kir_h, auto_crop=True)
+        # Label
+        pdf.set_xy(x, y - 8)
+        pdf.set_font(main_font, "B", 9)
+        pdf.cell(w, 8, label, ln=False, align='L')
         
-        # Right: Card KIR
-        right_x = left_x + half_w + 5
-        pdf.set_xy(right_x, kir_y - 6)
-        pdf.set_font(main_font, "B", 10)
-        pdf.cell(half_w, 6, "FOTO KARTU KIR :", ln=False, align='L')
-        pdf.rect(right_x, kir_y, half_w, kir_h)
-        fit_and_center_image(pdf, unit.get('images', {}).get('kir_card'), right_x, kir_y, half_w, kir_h, auto_crop=True)
-
-
-        # ==========================================
-        # HALAMAN 2: LAMPIRAN FOTO FISIK (Moved from Page 2)
-        # ==========================================
-        pdf.add_page()
-        pdf.set_font(main_font, "B", 11)
-        pdf.cell(0, 10, header_title, ln=True, align='L')
-        pdf.ln(5)
+        # Box
+        pdf.set_draw_color(0, 0, 0)
+        pdf.rect(x, y, w, h)
         
-        photo_items = [
-            ('TAMPAK DEPAN', 'front'),
-            ('TAMPAK BELAKANG', 'back'),
-            ('TAMPAK SAMPING KANAN', 'right'),
-            ('TAMPAK SAMPING KIRI', 'left')
-        ]
+        # Image
+        img_path = unit.get('images', {}).get(key)
+        placed[key] = fit_and_center_image(pdf, img_path, x, y, w, h, prepared=prepared.get(key))
         
-        for label, key in photo_items:
-            conf = layout.get(key, {})
-            x, y, w, h = conf.get('x', 0), conf.get('y', 0), conf.get('w', 90), conf.get('h', 80)
-            
-            # Label
-            pdf.set_xy(x, y - 8)
-            pdf.set_font(main_font, "B", 9)
-            pdf.cell(w, 8, label, ln=False, align='L')
-            
-            # Box
-            pdf.set_draw_color(0, 0, 0)
-            pdf.rect(x, y, w, h)
-            
-            # Image
-            img_path = unit.get('images', {}).get(key)
-            fit_and_center_image(pdf, img_path, x, y, w, h)
-            
 
-        # Check completeness for summary
-        doc_keys = ['stnk', 'tax', 'kir', 'kir_card']
-        photo_keys = ['front', 'back', 'right', 'left']
-        missing = []
-        for k in doc_keys + photo_keys:
-             path = unit.get('images', {}).get(k)
-             if not (path and os.path.exists(path)):
-                 missing.append(k.upper())
+    # Check completeness for summary: a Drive link or URL counts once it was
+    # actually drawn (checking it with os.path.exists always failed)
+    status, missing = completeness(placed)
+    metrics.UNIT_RENDER_SECONDS.observe(time.perf_counter() - start, format="pdf")
+    
+    return {
+        "nopol": nopol,
+        "bu": bu,
+        "status": status,
+        "missing": missing
+    }
 
-        status = "LENGKAP" if not missing else f"KURANG ({len(missing)})"
-        
-        processed_summary.append({
-            "nopol": nopol,
-            "bu": bu,
-            "status": status,
-            "missing": ", ".join(missing) if missing else "-"
-        })
+def completeness(available):
+    """
+    available: image key -> bool. Returns (status, missing) as shown on the
+    summary page, e.g. ("KURANG (2)", "KIR, KIR_CARD") or ("LENGKAP", "-").
+    """
+    missing = [k.upper() for k in IMAGE_KEYS if not available.get(k)]
+    status = "LENGKAP" if not missing else f"KURANG ({len(missing)})"
+    return status, ", ".join(missing) if missing else "-"
 
+def render_summary(pdf, main_font, processed_summary):
     # --- FINAL PAGE: SUMMARY ---
     pdf.add_page()
     pdf.set_font(main_font, "B", 14)
@@ -393,5 +633,39 @@ def create_multiset_pdf(units, output_path, layout_config=None):
         pdf.cell(col_w[4], 10, item['missing'], 1, 0, 'L')
         pdf.ln()
 
+def create_multiset_pdf(units, output_path, layout_config=None, return_stats=False, progress=None):
+    """
+    Renders the multi-unit asset report to output_path.
+    With return_stats=True returns (output_path, stats) where stats reports
+    the image bytes saved by downsampling.
+    progress(stage, unit_index, image_key=None) is called per image for "fetch"
+    and "crop" and per unit for "render"; raising from it aborts the render.
+    """
+    start = time.perf_counter()
+    pdf, main_font = new_multiset_pdf()
+    layout, boxes = resolve_layout(layout_config)
+
+    stats = {"images": 0, "image_bytes_original": 0, "image_bytes_embedded": 0}
+
+    processed_summary = []
+
+    # Images are resolved concurrently ahead of the page being drawn
+    prefetched = prefetch_unit_images(units, boxes=boxes, progress=progress)
+    for index, (unit, prepared) in enumerate(zip(units, prefetched)):
+        add_prefetch_stats(stats, prepared)
+        processed_summary.append(render_unit(pdf, main_font, unit, prepared, layout))
+        if progress:
+            progress("render", index)
+
+    render_summary(pdf, main_font, processed_summary)
+
     pdf.output(output_path)
+    metrics.REPORT_SECONDS.observe(time.perf_counter() - start, format="pdf")
+    metrics.REPORT_BYTES.observe(os.path.getsize(output_path), format="pdf")
+
+    stats["image_bytes_saved"] = stats["image_bytes_original"] - stats["image_bytes_embedded"]
+    print(f"INFO: PDF images: {stats['images']}, saved {stats['image_bytes_saved'] / 1024:.0f} KB by downsampling")
+
+    if return_stats:
+        return output_path, stats
     return output_path
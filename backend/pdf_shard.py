@@ -0,0 +1,118 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from pdf_generator import resolve_layout, prefetch_unit_images, add_prefetch_stats
+from pdf_stream import PdfStreamWriter, render_units_pdf, render_summary_pdf, PAGES_PER_UNIT
+import metrics
+
+# Parallel rendering: units are split into contiguous shards, each shard is
+# rendered to a partial PDF in a worker process and the parts are merged in
+# order, followed by the summary page.
+#
+# Config (env):
+#   PDF_SHARD_PROCESSES  worker processes (default: number of CPUs)
+PDF_SHARD_PROCESSES = int(os.environ.get("PDF_SHARD_PROCESSES", "0")) or os.cpu_count() or 1
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # "spawn" so the children don't inherit the server's threads or the YOLO model
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=PDF_SHARD_PROCESSES,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def shutdown_shard_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def split_shards(units, shards):
+    """Splits units into at most `shards` contiguous, nearly equal, non-empty slices."""
+    if not units:
+        # An empty shard would still render a (blank) page
+        return []
+    shards = max(1, min(shards, len(units)))
+    size, extra = divmod(len(units), shards)
+    result = []
+    start = 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        result.append(units[start:end])
+        start = end
+    return result
+
+
+def render_shard(units, layout_config, page_offset):
+    """
+    Worker process entry point. Renders a slice of units to a standalone PDF.
+    Returns (pdf_bytes, summary_rows, image_stats).
+    """
+    layout, boxes = resolve_layout(layout_config)
+    stats = {"images": 0, "image_bytes_original": 0, "image_bytes_embedded": 0}
+
+    prepared_list = []
+    for prepared in prefetch_unit_images(units, boxes=boxes):
+        add_prefetch_stats(stats, prepared)
+        prepared_list.append(prepared)
+
+    data, rows = render_units_pdf(units, prepared_list, layout, page_offset)
+    return data, rows, stats
+
+
+def create_multiset_pdf_sharded(units, output_path, layout_config=None, processes=None, return_stats=False):
+    """
+    Same output as create_multiset_pdf, rendered by several processes.
+    Page numbers stay continuous: each shard knows how many pages come before it.
+    """
+    start = time.perf_counter()
+    processes = processes or PDF_SHARD_PROCESSES
+    stats = {"images": 0, "image_bytes_original": 0, "image_bytes_embedded": 0, "shards": 0}
+
+    executor = _get_executor()
+    futures = []
+    page_offset = 0
+    for shard in split_shards(units, processes):
+        futures.append(executor.submit(render_shard, shard, layout_config, page_offset))
+        page_offset += len(shard) * PAGES_PER_UNIT
+
+    writer = PdfStreamWriter()
+    processed_summary = []
+    with open(output_path, "wb") as f:
+        f.write(writer.flush())
+
+        # Merged in submit order, so the document order matches `units`
+        for future in futures:
+            data, rows, shard_stats = future.result()
+            processed_summary.extend(rows)
+            for key, value in shard_stats.items():
+                stats[key] += value
+            stats["shards"] += 1
+
+            writer.add_pdf(data)
+            f.write(writer.flush())
+
+        writer.add_pdf(render_summary_pdf(processed_summary, len(units) * PAGES_PER_UNIT))
+        writer.close()
+        f.write(writer.flush())
+
+    metrics.REPORT_SECONDS.observe(time.perf_counter() - start, format="pdf")
+    metrics.REPORT_BYTES.observe(os.path.getsize(output_path), format="pdf")
+
+    if return_stats:
+        stats["image_bytes_saved"] = stats["image_bytes_original"] - stats["image_bytes_embedded"]
+        return output_path, stats
+    return output_path
@@ -0,0 +1,185 @@
+import io
+import os
+import time
+
+from pypdf import PdfReader
+from pypdf.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+from pdf_generator import (
+    new_multiset_pdf,
+    resolve_layout,
+    prefetch_unit_images,
+    render_unit,
+    render_summary,
+)
+import metrics
+
+# Units per chunk in streaming mode. Only one chunk (its pages + images) is held
+# in memory at a time, so peak memory does not grow with the number of units.
+#
+# Config (env):
+#   STREAM_CHUNK_UNITS  units rendered (and held in memory) per streamed chunk
+STREAM_CHUNK_UNITS = int(os.environ.get("STREAM_CHUNK_UNITS", "10"))
+
+# Every unit is exactly two pages (documents + photos)
+PAGES_PER_UNIT = 2
+
+
+class PdfStreamWriter:
+    """
+    Writes one PDF incrementally from many small PDFs.
+
+    Pages of each part are copied (with their resources) and written out
+    straight away; only the object offsets are kept. The page tree, catalog
+    and xref table are written at the end by close().
+    """
+    PAGES_ID = 1
+    CATALOG_ID = 2
+
+    def __init__(self):
+        self._next_id = 3
+        self._offsets = {}
+        self._page_ids = []
+        self._position = 0
+        self._buffer = io.BytesIO()
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self._buffer.write(data)
+        self._position += len(data)
+
+    def _alloc(self):
+        obj_id = self._next_id
+        self._next_id += 1
+        return obj_id
+
+    def _write_object(self, obj_id, obj):
+        self._offsets[obj_id] = self._position
+        body = io.BytesIO()
+        obj.write_to_stream(body)
+        self._write(f"{obj_id} 0 obj\n".encode("ascii") + body.getvalue() + b"\nendobj\n")
+
+    def _copy(self, obj, mapping):
+        if isinstance(obj, IndirectObject):
+            key = (obj.idnum, obj.generation)
+            if key not in mapping:
+                new_id = self._alloc()
+                mapping[key] = new_id
+                self._write_object(new_id, self._copy(obj.get_object(), mapping))
+            return IndirectObject(mapping[key], 0, None)
+
+        if isinstance(obj, StreamObject):
+            copied = obj.__class__()
+            copied._data = obj._data
+            for key, value in obj.items():
+                if key != "/Length":
+                    copied[NameObject(key)] = self._copy(value, mapping)
+            return copied
+
+        if isinstance(obj, DictionaryObject):
+            copied = DictionaryObject()
+            for key, value in obj.items():
+                copied[NameObject(key)] = self._copy(value, mapping)
+            return copied
+
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._copy(value, mapping) for value in obj)
+
+        return obj
+
+    def add_pdf(self, data):
+        """Appends all pages of a PDF (bytes)."""
+        reader = PdfReader(io.BytesIO(data))
+        mapping = {}
+        for page in reader.pages:
+            page_obj = DictionaryObject()
+            for key, value in page.items():
+                if key != "/Parent":
+                    page_obj[NameObject(key)] = self._copy(value, mapping)
+            page_obj[NameObject("/Parent")] = IndirectObject(self.PAGES_ID, 0, None)
+
+            page_id = self._alloc()
+            self._write_object(page_id, page_obj)
+            self._page_ids.append(page_id)
+
+    def close(self):
+        """Writes the page tree, catalog, xref and trailer."""
+        pages = DictionaryObject({
+            NameObject("/Type"): NameObject("/Pages"),
+            NameObject("/Kids"): ArrayObject(IndirectObject(i, 0, None) for i in self._page_ids),
+            NameObject("/Count"): NumberObject(len(self._page_ids)),
+        })
+        self._write_object(self.PAGES_ID, pages)
+
+        catalog = DictionaryObject({
+            NameObject("/Type"): NameObject("/Catalog"),
+            NameObject("/Pages"): IndirectObject(self.PAGES_ID, 0, None),
+        })
+        self._write_object(self.CATALOG_ID, catalog)
+
+        xref_position = self._position
+        lines = [f"xref\n0 {self._next_id}\n", "0000000000 65535 f \n"]
+        for obj_id in range(1, self._next_id):
+            lines.append(f"{self._offsets[obj_id]:010d} 00000 n \n")
+        lines.append(f"trailer\n<< /Size {self._next_id} /Root {self.CATALOG_ID} 0 R >>\n")
+        lines.append(f"startxref\n{xref_position}\n%%EOF\n")
+        self._write("".join(lines).encode("ascii"))
+
+    def flush(self):
+        """Returns the bytes written since the last flush."""
+        data = self._buffer.getvalue()
+        self._buffer = io.BytesIO()
+        return data
+
+
+def render_units_pdf(units, prepared_list, layout, page_offset):
+    """Renders some units into a standalone PDF. Returns (bytes, summary_rows)."""
+    pdf, main_font = new_multiset_pdf(page_offset)
+    rows = [render_unit(pdf, main_font, unit, prepared, layout) for unit, prepared in zip(units, prepared_list)]
+    return bytes(pdf.output()), rows
+
+
+def render_summary_pdf(processed_summary, page_offset):
+    pdf, main_font = new_multiset_pdf(page_offset)
+    render_summary(pdf, main_font, processed_summary)
+    return bytes(pdf.output())
+
+
+def stream_multiset_pdf(units, layout_config=None, chunk_units=None):
+    """
+    Generator version of create_multiset_pdf: yields the PDF as bytes while it
+    is being produced. Units are rendered in chunks of `chunk_units`, each chunk
+    is written out and dropped; the summary page comes last.
+    """
+    start = time.perf_counter()
+    chunk_units = chunk_units or STREAM_CHUNK_UNITS
+    layout, boxes = resolve_layout(layout_config)
+    writer = PdfStreamWriter()
+    yield writer.flush()
+
+    processed_summary = []
+    prefetched = prefetch_unit_images(units, boxes=boxes)
+
+    for offset in range(0, len(units), chunk_units):
+        chunk = units[offset:offset + chunk_units]
+        prepared_list = [next(prefetched) for _ in chunk]
+
+        data, rows = render_units_pdf(chunk, prepared_list, layout, offset * PAGES_PER_UNIT)
+        processed_summary.extend(rows)
+
+        writer.add_pdf(data)
+        yield writer.flush()
+
+    writer.add_pdf(render_summary_pdf(processed_summary, len(units) * PAGES_PER_UNIT))
+    writer.close()
+    yield writer.flush()
+    # Only counted when the client read the whole stream
+    metrics.REPORT_SECONDS.observe(time.perf_counter() - start, format="pdf")
+    metrics.REPORT_BYTES.observe(writer._position, format="pdf")
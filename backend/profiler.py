@@ -0,0 +1,108 @@
+import os
+import sys
+import uuid
+import threading
+from collections import Counter
+
+from scratch import SCRATCH_DIR
+
+# On-demand sampling profiler for single requests (see the profile middleware in
+# main.py). While a profiled request runs, a background thread snapshots the
+# Python stacks of all threads every PROFILE_INTERVAL_MS; the result is stored
+# in the collapsed-stack format ("frame;frame;frame count" per line) that
+# flamegraph.pl, speedscope and most flame-graph viewers read directly.
+#
+# Sampling is process-wide, since a report's work runs in pool threads (fetch,
+# crop, render). Idle threads are dropped, but other requests running at the
+# same time do show up; profile on a quiet worker for clean results.
+#
+# Nothing runs unless a request asks for a profile and PROFILING_ENABLED is set.
+#
+# Config (env):
+#   PROFILING_ENABLED    1 to allow profiling (X-Profile header / ?profile=1)
+#   PROFILE_INTERVAL_MS  sampling interval
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.path.join(SCRATCH_DIR, "profiles")
+
+# Files whose frames mean "blocked, waiting for work" when they are on top of the stack
+_IDLE_FILES = ("threading.py", "queue.py", "selectors.py", "base_events.py")
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_name(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    # co_qualname is 3.11+; older versions only have the bare function name
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _is_idle(frame):
+    # Idle pool workers / event loop: blocked in threading/queue/selectors with
+    # no application code on the stack. Waits inside app code are kept.
+    if not frame.f_code.co_filename.endswith(_IDLE_FILES):
+        return False
+    while frame is not None:
+        if frame.f_code.co_filename.startswith(_APP_DIR):
+            return False
+        frame = frame.f_back
+    return True
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms=None):
+        self.interval = (interval_ms or PROFILE_INTERVAL_MS) / 1000.0
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or _is_idle(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """Collapsed stacks, heaviest first."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def new_profile_id():
+    return uuid.uuid4().hex
+
+
+def save_profile(profile_id, profiler):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    with open(path, "w") as f:
+        f.write(profiler.collapsed())
+    return path
+
+
+def get_profile_path(profile_id):
+    """Path of a stored profile, or None (also for malformed IDs)."""
+    try:
+        if uuid.UUID(hex=profile_id).hex != profile_id:
+            return None
+    except ValueError:
+        return None
+    path = os.path.join(PROFILE_DIR, f"{profile_id}.folded")
+    return path if os.path.exists(path) else None
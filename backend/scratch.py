@@ -0,0 +1,201 @@
+import os
+import time
+import threading
+
+# Lifecycle of the scratch space (temp_uploads).
+# Generated reports are deleted once their response has been sent. Everything
+# else the sweeper manages (decoded/uploaded images in assets/, request profiles
+# in profiles/, stray files in the top level) is removed after SCRATCH_TTL_SECONDS, oldest first when the
+# total goes over SCRATCH_MAX_MB. The Drive / document-crop caches and job
+# outputs have their own limits and are only counted, never swept here; job
+# retention runs from the sweeper thread through add_sweep_hook(). Files that
+# are still needed (photos of queued/running jobs) are reported by
+# add_keep_hook() callbacks and skipped by both the TTL and the quota.
+#
+# Config (env):
+#   SCRATCH_TTL_SECONDS             max age of a scratch file (mtime)
+#   SCRATCH_MAX_MB                  byte quota of the swept directories
+#   SCRATCH_SWEEP_INTERVAL_SECONDS  how often the background sweeper runs
+SCRATCH_DIR = "temp_uploads"
+SCRATCH_TTL_SECONDS = int(os.environ.get("SCRATCH_TTL_SECONDS", "3600"))
+SCRATCH_MAX_BYTES = int(os.environ.get("SCRATCH_MAX_MB", "1024")) * 1024 * 1024
+SCRATCH_SWEEP_INTERVAL = int(os.environ.get("SCRATCH_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Swept directories, relative to SCRATCH_DIR ("" = top level only, not recursive)
+SWEPT_DIRS = ("", "assets", "profiles")
+
+_lock = threading.Lock()
+_sweeper = None
+_stop = threading.Event()
+_hooks = []
+_keep_hooks = []
+
+_stats = {
+    "sweeps": 0,
+    "last_sweep": None,
+    "expired_files": 0,
+    "evicted_files": 0,
+    "deleted_after_response": 0,
+    "deleted_bytes": 0,
+    "kept_in_use_files": 0,
+}
+
+
+def _scan(directory):
+    """Returns [(mtime, size, path)] of the regular files directly in directory."""
+    files = []
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        try:
+            if entry.is_file(follow_symlinks=False):
+                st = entry.stat()
+                files.append((st.st_mtime, st.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+    return files
+
+
+def _remove(path, size, counter):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        return False
+    with _lock:
+        _stats[counter] += 1
+        _stats["deleted_bytes"] += size
+    return True
+
+
+def remove_file(path):
+    """Deletes a finished output file (used as a response background task)."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    _remove(path, size, "deleted_after_response")
+
+
+def add_keep_hook(fn):
+    """fn() returns paths that are still in use; sweep() never removes them."""
+    if fn not in _keep_hooks:
+        _keep_hooks.append(fn)
+
+
+def _in_use():
+    paths = set()
+    for hook in list(_keep_hooks):
+        try:
+            paths.update(os.path.abspath(path) for path in hook())
+        except Exception as e:
+            print(f"WARN: Keep hook {getattr(hook, '__name__', hook)} failed: {e}")
+    return paths
+
+
+def sweep(ttl_seconds=None, max_bytes=None, now=None):
+    """Applies the TTL, then the byte quota (oldest files first). Returns files deleted."""
+    ttl_seconds = SCRATCH_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    max_bytes = SCRATCH_MAX_BYTES if max_bytes is None else max_bytes
+    now = time.time() if now is None else now
+
+    files = []
+    for sub in SWEPT_DIRS:
+        files.extend(_scan(os.path.join(SCRATCH_DIR, sub)))
+    files.sort()
+    in_use = _in_use()
+
+    deleted = 0
+    kept = []
+    in_use_files = 0
+    in_use_bytes = 0
+    for mtime, size, path in files:
+        if os.path.abspath(path) in in_use:
+            # Counts towards the quota, but is never removed
+            in_use_files += 1
+            in_use_bytes += size
+        elif ttl_seconds and now - mtime > ttl_seconds:
+            deleted += _remove(path, size, "expired_files")
+        else:
+            kept.append((mtime, size, path))
+
+    total = in_use_bytes + sum(size for _, size, _ in kept)
+    for mtime, size, path in kept:
+        if not max_bytes or total <= max_bytes:
+            break
+        if _remove(path, size, "evicted_files"):
+            deleted += 1
+        total -= size
+
+    with _lock:
+        _stats["sweeps"] += 1
+        _stats["last_sweep"] = now
+        _stats["kept_in_use_files"] = in_use_files
+    return deleted
+
+
+def disk_usage():
+    """Files and bytes per scratch subdirectory, plus sweeper counters."""
+    usage = {}
+    for root, _, filenames in os.walk(SCRATCH_DIR):
+        rel = os.path.relpath(root, SCRATCH_DIR)
+        top = "." if rel == "." else rel.split(os.sep)[0]
+        entry = usage.setdefault(top, {"files": 0, "bytes": 0})
+        for name in filenames:
+            try:
+                entry["bytes"] += os.path.getsize(os.path.join(root, name))
+                entry["files"] += 1
+            except OSError:
+                pass
+
+    swept = {sub or "." for sub in SWEPT_DIRS}
+    with _lock:
+        stats = dict(_stats)
+    stats.update({
+        "directories": usage,
+        "total_bytes": sum(e["bytes"] for e in usage.values()),
+        "swept_bytes": sum(e["bytes"] for k, e in usage.items() if k in swept),
+        "quota_bytes": SCRATCH_MAX_BYTES,
+        "ttl_seconds": SCRATCH_TTL_SECONDS,
+    })
+    return stats
+
+
+def add_sweep_hook(fn):
+    """Calls fn() after every background sweep, for cleanups with their own rules."""
+    if fn not in _hooks:
+        _hooks.append(fn)
+
+
+def _run_sweeper(interval):
+    while True:
+        try:
+            deleted = sweep()
+            if deleted:
+                print(f"INFO: Removed {deleted} stale files from {SCRATCH_DIR}")
+        except Exception as e:
+            print(f"WARN: Scratch sweep failed: {e}")
+        for hook in list(_hooks):
+            try:
+                hook()
+            except Exception as e:
+                print(f"WARN: Sweep hook {getattr(hook, '__name__', hook)} failed: {e}")
+        if _stop.wait(interval):
+            break
+
+
+def start_sweeper(interval=None):
+    """Sweeps now and then every `interval` seconds, in a daemon thread."""
+    global _sweeper
+    interval = interval or SCRATCH_SWEEP_INTERVAL
+    if _sweeper is None:
+        _stop.clear()
+        _sweeper = threading.Thread(target=_run_sweeper, args=(interval,), name="scratch-sweeper", daemon=True)
+        _sweeper.start()
+
+
+def stop_sweeper():
+    global _sweeper
+    _stop.set()
+    _sweeper = None
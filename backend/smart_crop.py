@@ -1,3 +1,10 @@
+import os
+import io
+import hashlib
+
+from cache import MemoryLRU, DiskCache, TieredCache
+import metrics
+
 try:
     import cv2
     import numpy as np
@@ -7,6 +14,33 @@ except ImportError:
     np = None
     imutils = None
 
+# --- PARAMETER DETEKSI ---
+RESIZE_HEIGHT = 500
+CANNY_LOW = 75
+CANNY_HIGH = 200
+APPROX_EPSILON = 0.02
+JPEG_QUALITY = 100
+
+# --- CACHE HASIL CROP ---
+# Key = hash isi gambar + parameter crop. Nilai = JPEG hasil warp,
+# atau bytes kosong (b"") artinya "tidak ada dokumen ditemukan".
+# Regenerate laporan tidak perlu mengulang deteksi untuk gambar yang sama.
+DOC_CROP_CACHE_DIR = os.environ.get("DOC_CROP_CACHE_DIR", os.path.join("temp_uploads", "doc_crop_cache"))
+DOC_CROP_CACHE_MEMORY_BYTES = int(os.environ.get("DOC_CROP_CACHE_MEMORY_MB", "64")) * 1024 * 1024
+DOC_CROP_CACHE_DISK_BYTES = int(os.environ.get("DOC_CROP_CACHE_DISK_MB", "1024")) * 1024 * 1024
+DOC_CROP_CACHE_TTL = int(os.environ.get("DOC_CROP_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+doc_crop_cache = TieredCache(
+    MemoryLRU(DOC_CROP_CACHE_MEMORY_BYTES),
+    DiskCache(DOC_CROP_CACHE_DIR, DOC_CROP_CACHE_DISK_BYTES, DOC_CROP_CACHE_TTL),
+)
+
+NO_DOCUMENT = b""
+
+def _cache_key(data):
+    params = f"v1:{RESIZE_HEIGHT}:{CANNY_LOW}:{CANNY_HIGH}:{APPROX_EPSILON}:{JPEG_QUALITY}"
+    return hashlib.sha256(data).hexdigest() + ":" + params
+
 # --- FUNGSI MATEMATIKA UNTUK MELURUSKAN SUDUT ---
 def order_points(pts):
     rect = np.zeros((4, 2), dtype="float32")
@@ -49,63 +83,86 @@ def smart_doc_crop(image_bytes):
     """
     Menerima bytes gambar, mencoba crop dokumen (perspektif),
     mengembalikan bytes gambar hasil crop (atau asli jika gagal).
+    Hasil (termasuk "tidak ada dokumen") di-cache berdasarkan hash isi gambar.
     """
     try:
         if imutils is None:
             print("INFO: imutils not installed, skipping smart crop")
             return image_bytes
 
-        # Konversi bytes ke numpy array
-        nparr = np.frombuffer(image_bytes.getvalue(), np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        if image is None:
-            return image_bytes
-
-        orig = image.copy()
-        
-        # 1. Resize agar deteksi lebih cepat & akurat (tinggi 500px)
-        ratio = image.shape[0] / 500.0
-        image = imutils.resize(image, height=500)
-
-        # 2. Preprocessing (Grayscale -> Blur -> Edges)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (5, 5), 0)
-        edged = cv2.Canny(gray, 75, 200)
+        data = image_bytes.getvalue()
+        key = _cache_key(data)
 
-        # 3. Cari Kontur
-        cnts = cv2.findContours(edged.copy(), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
-        cnts = imutils.grab_contours(cnts)
-        cnts = sorted(cnts, key=cv2.contourArea, reverse=True)[:5]
+        cached = doc_crop_cache.get(key)
+        metrics.DOC_CROP_CACHE.inc(result="hit" if cached is not None else "miss")
+        if cached is not None:
+            if cached == NO_DOCUMENT:
+                return image_bytes
+            return io.BytesIO(cached)
 
-        screenCnt = None
-        
-        # 4. Cari kontur segi empat (kertas)
-        for c in cnts:
-            peri = cv2.arcLength(c, True)
-            approx = cv2.approxPolyDP(c, 0.02 * peri, True)
-            
-            # Jika punya 4 sudut, kemungkinan itu kertas
-            if len(approx) == 4:
-                screenCnt = approx
-                break
-
-        if screenCnt is None:
-            # Gagal deteksi kertas, kembalikan asli
-            print("INFO: Smart Crop - No document found found")
-            return image_bytes
-        
-        # 5. Luruskan (Warp) - Gunakan koordinat asli (dikalikan rasio)
-        warped = four_point_transform(orig, screenCnt.reshape(4, 2) * ratio)
-        
-        # 6. Encode kembali ke bytes
-        success, encoded_img = cv2.imencode('.jpg', warped, [cv2.IMWRITE_JPEG_QUALITY, 100])
-        if success:
-            import io
-            return io.BytesIO(encoded_img.tobytes())
-        else:
+        with metrics.DOC_CROP_SECONDS.time():
+            result = _detect_and_warp(data)
+        if result is None:
+            doc_crop_cache.put(key, NO_DOCUMENT)
             return image_bytes
 
+        doc_crop_cache.put(key, result)
+        return io.BytesIO(result)
+
     except Exception as e:
         print(f"Error Smart Crop: {e}")
         return image_bytes
+
+def _detect_and_warp(data):
+    """
+    Deteksi dokumen + warp. Mengembalikan JPEG bytes hasil crop,
+    atau None jika tidak ada dokumen ditemukan.
+    """
+    # Konversi bytes ke numpy array
+    nparr = np.frombuffer(data, np.uint8)
+    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    
+    if image is None:
+        return None
+
+    orig = image.copy()
+    
+    # 1. Resize agar deteksi lebih cepat & akurat (tinggi 500px)
+    ratio = image.shape[0] / float(RESIZE_HEIGHT)
+    image = imutils.resize(image, height=RESIZE_HEIGHT)
+
+    # 2. Preprocessing (Grayscale -> Blur -> Edges)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = cv2.GaussianBlur(gray, (5, 5), 0)
+    edged = cv2.Canny(gray, CANNY_LOW, CANNY_HIGH)
+
+    # 3. Cari Kontur
+    cnts = cv2.findContours(edged.copy(), cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+    cnts = imutils.grab_contours(cnts)
+    cnts = sorted(cnts, key=cv2.contourArea, reverse=True)[:5]
+
+    screenCnt = None
+    
+    # 4. Cari kontur segi empat (kertas)
+    for c in cnts:
+        peri = cv2.arcLength(c, True)
+        approx = cv2.approxPolyDP(c, APPROX_EPSILON * peri, True)
+        
+        # Jika punya 4 sudut, kemungkinan itu kertas
+        if len(approx) == 4:
+            screenCnt = approx
+            break
+
+    if screenCnt is None:
+        # Gagal deteksi kertas, kembalikan asli
+        print("INFO: Smart Crop - No document found found")
+        return None
+    
+    # 5. Luruskan (Warp) - Gunakan koordinat asli (dikalikan rasio)
+    warped = four_point_transform(orig, screenCnt.reshape(4, 2) * ratio)
+    
+    # 6. Encode kembali ke bytes
+    success, encoded_img = cv2.imencode('.jpg', warped, [cv2.IMWRITE_JPEG_QUALITY, JPEG_QUALITY])
+    if success:
+        return encoded_img.tobytes()
+    return None
@@ -0,0 +1,128 @@
+import io
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from PIL import Image
+
+# Local stand-in for drive.google.com used by tests and benchmarks.
+# Serves /thumbnail?id=... and /uc?export=download&id=... with a generated JPEG,
+# counts TCP connections and can simulate a slow TCP+TLS handshake.
+
+
+def make_jpeg(width=64, height=48, color=(200, 30, 30), quality=85):
+    buf = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep the connection alive
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; avoid Nagle/delayed-ACK stalls on reused connections
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        if server.handshake_delay:
+            time.sleep(server.handshake_delay)
+
+    def do_GET(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        file_id = query.get("id", [None])[0]
+
+        with server.lock:
+            server.requests += 1
+
+        if server.response_delay:
+            time.sleep(server.response_delay)
+
+        body = server.images.get(file_id, server.default_image) if file_id else None
+        if parsed.path == "/thumbnail" and server.thumbnail_ok and body:
+            self._send(200, "image/jpeg", body)
+        elif parsed.path == "/uc" and body:
+            self._send(200, "image/jpeg", body)
+        else:
+            self._send(404, "text/html", b"<html>not found</html>")
+
+    def do_HEAD(self):
+        server = self.server
+        parsed = urlparse(self.path)
+        file_id = parse_qs(parsed.query).get("id", [None])[0]
+        body = server.images.get(file_id, server.default_image) if file_id else None
+        self.send_response(200 if body else 404)
+        self.send_header("Content-Type", "image/jpeg" if body else "text/html")
+        self.send_header("Content-Length", str(len(body)) if body else "0")
+        self.end_headers()
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubDriveServer:
+    """
+    Usage:
+        with StubDriveServer(handshake_delay=0.02) as server:
+            pdf_generator.DRIVE_BASE_URL = server.url
+    """
+    def __init__(self, handshake_delay=0.0, response_delay=0.0, thumbnail_ok=True, image=None):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.httpd.connections = 0
+        self.httpd.requests = 0
+        self.httpd.handshake_delay = handshake_delay
+        self.httpd.response_delay = response_delay
+        self.httpd.thumbnail_ok = thumbnail_ok
+        self.httpd.default_image = image or make_jpeg()
+        self.httpd.images = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def connections(self):
+        return self.httpd.connections
+
+    @property
+    def requests(self):
+        return self.httpd.requests
+
+    def add_image(self, file_id, data):
+        self.httpd.images[file_id] = data
+
+    def reset_counters(self):
+        with self.httpd.lock:
+            self.httpd.connections = 0
+            self.httpd.requests = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,68 @@
+import os
+import sys
+import base64
+from fastapi.testclient import TestClient
+from main import app
+
+# Add current directory to path so we can import main
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+client = TestClient(app)
+
+# 1x1 pixel red dot
+DUMMY_JPEG = base64.b64decode("/9j/4AAQSkZJRgABAQEASABIAAD/2wBDAAMCAgMCAgMDAwMEAwMEBQgFBQQEBQoHBwYIDAoMDAsKCwsNDhIQDQ4RDgsLEBYQERMUFRUVDA8XGBYUGBIUFRT/2wBDAQMEBAUEBQkFBQkUDQsNFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBQUFBT/wAARCAABAAEDAREAAhEBAxEB/8QAHwAAAQUBAQEBAQEAAAAAAAAAAAECAwQFBgcICQoL/8QAtRAAAgEDAwIEAwUFBAQAAAF9AQIDAAQRBRIhMUEGE1FhByJxFDKBkaEII0KxwRVS0fAkM2JyggkKFhcYGRolJicoKSo0NTY3ODk6Q0RFRkdISUpTVFVWV1hZWmNkZWZnaGlqc3R1dnd4eXqDhIWGh4iJipKTlJWWl5iZmqKjpKWmp6ipqrKztLW2t7i5usLDxMXGx8jJytLT1NXW19jZ2uHi4+Tl5ufo6erx8vP09fb3+Pn6/8QAHwEAAwEBAQEBAQEBAQAAAAAAAAECAwQFBgcICQoL/8QAtREAAgECBAQDBAcFBAQAAQJ3AAECAxEEBSExBhJBUQdhcRMiMoEIFEKRobHBCSMzUvAVYnLRChYkNOEl8RcYGRomJygpKjU2Nzg5OkNERUZHSElKU1RVVldYWVpjZGVmZ2hpanN0dXZ3eHl6goOEhYaHiImKkpOUlZaXmJmaoqOkpaanqKmqsrO0tba3uLm6wsPExcbHyMnK0tPU1dbX2Nna4uPk5ebn6Onq8vP09fb3+Pn6/9oADAMBAAIRAxEAPwD9U6KKKAP/2Q==")
+
+def test_upload_asset_is_deduplicated():
+    first = client.post("/assets", files={"file": ("a.jpg", DUMMY_JPEG, "image/jpeg")})
+    second = client.post("/assets", files={"file": ("b.jpg", DUMMY_JPEG, "image/jpeg")})
+
+    assert first.status_code == 200
+    assert second.status_code == 200
+    assert first.json()["asset_id"] == second.json()["asset_id"]
+
+    asset_id = first.json()["asset_id"]
+    assert client.head(f"/assets/{asset_id}").status_code == 200
+    assert client.head(f"/assets/{'0' * 64}").status_code == 404
+
+def test_generate_with_asset_id():
+    asset_id = client.post("/assets", files={"file": ("a.jpg", DUMMY_JPEG, "image/jpeg")}).json()["asset_id"]
+
+    payload = {
+        "units": [
+            {
+                "nopol": "B 1234 ASSET",
+                "bu": "TEST_BU",
+                "lokasi": "TEST_LOC",
+                "images": {
+                    "front": asset_id,
+                    "stnk": asset_id
+                }
+            }
+        ]
+    }
+
+    response = client.post("/generate-multiset", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+
+    response = client.post("/generate-multiset-docx", json=payload)
+    assert response.status_code == 200
+
+def test_unknown_asset_ids_are_rejected():
+    asset_id = client.post("/assets", files={"file": ("a.jpg", DUMMY_JPEG, "image/jpeg")}).json()["asset_id"]
+    unknown = ["a" * 64, "b" * 64]
+    payload = {"units": [
+        {"nopol": "B 1 ASSET", "bu": "BU", "lokasi": "LOC", "images": {"front": asset_id, "back": unknown[0]}},
+        {"nopol": "B 2 ASSET", "bu": "BU", "lokasi": "LOC", "images": {"stnk": unknown[1], "left": unknown[0]}},
+    ]}
+
+    for path in ("/generate-multiset", "/generate-multiset-docx", "/jobs"):
+        response = client.post(path, json=payload)
+        assert response.status_code == 422
+        detail = response.json()["detail"]
+        assert unknown[0] in detail and unknown[1] in detail and asset_id not in detail
+
+if __name__ == "__main__":
+    test_upload_asset_is_deduplicated()
+    test_generate_with_asset_id()
+    test_unknown_asset_ids_are_rejected()
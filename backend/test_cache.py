@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+# Add current directory to path so we can import cache
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from cache import MemoryLRU, DiskCache, TieredCache
+
+def test_memory_lru_byte_budget():
+    lru = MemoryLRU(max_bytes=10)
+    lru.put("a", b"12345")
+    lru.put("b", b"12345")
+    lru.get("a")  # "a" is now most recently used
+    lru.put("c", b"12345")
+
+    assert lru.get("a") == b"12345"
+    assert lru.get("b") is None
+    assert lru.current_bytes == 10
+
+def test_disk_cache_ttl_and_size(tmp_path):
+    disk = DiskCache(str(tmp_path), max_bytes=10, ttl_seconds=60)
+    disk.put("a", b"12345")
+    disk.put("b", b"12345")
+    os.utime(disk._path("a"), (time.time() - 10, time.time() - 10))
+    disk.put("c", b"12345")
+
+    # Oldest entry is evicted to stay within budget
+    assert disk.get("a") is None
+    assert disk.get("c") == b"12345"
+
+    old = time.time() - 120
+    os.utime(disk._path("c"), (old, old))
+    assert disk.get("c") is None
+
+def test_tiered_cache_counters(tmp_path):
+    cache = TieredCache(MemoryLRU(100), DiskCache(str(tmp_path), 100, 60))
+    assert cache.get("file") is None
+    cache.put("file", b"data")
+    assert cache.get("file") == b"data"
+
+    cache.memory.clear()
+    assert cache.get("file") == b"data"
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["memory_hits"] == 1
+    assert stats["disk_hits"] == 1
@@ -0,0 +1,47 @@
+import os
+import sys
+import json
+from fastapi.testclient import TestClient
+from main import app
+
+# Add current directory to path so we can import main
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_drive import make_jpeg
+
+client = TestClient(app)
+
+def test_crop_batch_streams_one_line_per_image():
+    asset_id = client.post("/assets", files={"file": ("a.jpg", make_jpeg(120, 90), "image/jpeg")}).json()["asset_id"]
+
+    response = client.post(
+        "/crop-batch",
+        files=[
+            ("files", ("front.jpg", make_jpeg(320, 240), "image/jpeg")),
+            ("files", ("back.jpg", make_jpeg(300, 200), "image/jpeg")),
+        ],
+        data={"asset_ids": [asset_id]},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r["index"] for r in records) == [0, 1, 2]
+    for record in records:
+        assert "error" not in record
+        assert record["image"].startswith("data:image/jpeg;base64,")
+
+def test_crop_batch_requires_input():
+    response = client.post("/crop-batch")
+    assert response.status_code == 400
+
+def test_crop_does_not_write_temp_files():
+    before = set(os.listdir("temp_uploads"))
+    response = client.post("/crop", files={"file": ("front.jpg", make_jpeg(320, 240), "image/jpeg")})
+    after = set(os.listdir("temp_uploads"))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.content[:2] == b"\xff\xd8"
+    assert after == before
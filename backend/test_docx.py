@@ -54,5 +54,53 @@ def test_generate_multiset_docx():
         f.write(response.content)
     print(f"DOCX saved to {output_filename}")
 
+def test_docx_unit_pages_from_template(tmp_path):
+    import zipfile
+    from docx import Document
+    from docx_generator import create_multiset_docx
+    from stub_drive import make_jpeg
+
+    from asset_store import save_asset
+    photo = save_asset(make_jpeg(400, 300))
+    units = [
+        {"nopol": f"B {i} TPL", "bu": "BU", "lokasi": "JKT", "images": {"stnk": photo, "front": photo}}
+        for i in range(3)
+    ]
+    output = tmp_path / "out.docx"
+    create_multiset_docx({"units": units}, str(output))
+
+    doc = Document(str(output))
+    texts = [p.text for p in doc.paragraphs]
+    for i in range(3):
+        assert texts.count(f"BU : BU - JKT - B {i} TPL") == 2
+    assert not any("{{" in p.text for p in doc.paragraphs)
+    assert len(doc.inline_shapes) == 6
+    # 2 tables per unit + summary
+    assert len(doc.tables) == 7
+    assert "[Tidak Ada Gambar]" in doc.tables[0].cell(1, 0).text
+
+    # The identical photo is stored once
+    media = [n for n in zipfile.ZipFile(output).namelist() if n.startswith("word/media/")]
+    assert len(media) == 1
+
+def test_concurrent_docx_requests_get_their_own_file():
+    # Same-second requests used to share one temp_uploads path
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+    from docx import Document
+
+    def request(nopol):
+        payload = {"units": [{"nopol": nopol, "bu": "BU", "lokasi": "LOC", "images": {}}]}
+        return nopol, client.post("/generate-multiset-docx", json=payload)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(request, [f"B {i} CONC" for i in range(4)]))
+
+    for nopol, response in results:
+        assert response.status_code == 200
+        assert response.headers["content-disposition"].startswith('attachment; filename="ba_asset_multiset_')
+        text = "\n".join(p.text for p in Document(io.BytesIO(response.content)).paragraphs)
+        assert nopol in text
+
 if __name__ == "__main__":
     test_generate_multiset_docx()
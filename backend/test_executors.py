@@ -0,0 +1,86 @@
+import os
+import sys
+import time
+import asyncio
+
+# Add current directory to path so we can import executors
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from executors import BoundedExecutor, PoolBusy
+
+def test_pool_keeps_event_loop_free():
+    pool = BoundedExecutor("test", max_workers=1)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        tick_task = asyncio.create_task(ticker())
+        results = await asyncio.gather(pool.run(time.sleep, 0.1), pool.run(time.sleep, 0.1))
+        tick_task.cancel()
+        return ticks, results
+
+    ticks, results = asyncio.run(scenario())
+    pool.shutdown()
+
+    # The loop kept running while the blocking calls ran in the pool
+    assert ticks >= 10
+    stats = pool.stats()
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0
+    # One job had to wait for the single worker
+    assert stats["max_wait_seconds"] >= 0.05
+
+def test_pool_rejects_when_queue_full():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+
+    async def scenario():
+        jobs = [asyncio.create_task(pool.run(time.sleep, 0.1)) for _ in range(3)]
+        return await asyncio.gather(*jobs, return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    pool.shutdown()
+
+    assert sum(isinstance(r, PoolBusy) for r in results) == 1
+    assert pool.stats()["rejected"] == 1
+
+def test_stream_holds_a_slot_until_exhausted():
+    pool = BoundedExecutor("test", max_workers=1, max_queue=1)
+    seen = []
+
+    def chunks():
+        for i in range(3):
+            seen.append(pool.stats()["in_flight"])
+            yield i
+
+    async def scenario():
+        items = [item async for item in pool.stream(chunks())]
+        # The stream and one queued job fill the pool, so a third is rejected
+        slow = pool.stream(chunks())
+        first = await slow.__anext__()
+        queued = asyncio.create_task(pool.run(time.sleep, 0.1))
+        await asyncio.sleep(0.01)
+        try:
+            pool.stream(chunks())
+            busy = False
+        except PoolBusy:
+            busy = True
+        rest = [item async for item in slow]
+        await queued
+        return items, [first] + rest, busy
+
+    items, slow_items, busy = asyncio.run(scenario())
+    pool.shutdown()
+
+    assert items == slow_items == [0, 1, 2]
+    assert seen[:3] == [1, 1, 1]
+    assert busy
+    stats = pool.stats()
+    assert stats["in_flight"] == 0
+    assert stats["completed"] == 3
+    assert stats["rejected"] == 1
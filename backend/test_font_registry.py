@@ -0,0 +1,87 @@
+import os
+import sys
+import io
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from pypdf import PdfReader
+
+from font_registry import FontRegistry, FONT_FILE_SETS
+from pdf_generator import MultiSetPDF, render_summary
+
+def _make_font(path, family, style):
+    # Minimal TrueType font: a box glyph for printable ASCII
+    chars = [chr(c) for c in range(33, 127)]
+    names = [f"g{ord(c)}" for c in chars]
+    fb = FontBuilder(1000, isTTF=True)
+    fb.setupGlyphOrder([".notdef", "space"] + names)
+    fb.setupCharacterMap({32: "space", **{ord(c): n for c, n in zip(chars, names)}})
+
+    pen = TTGlyphPen(None)
+    pen.moveTo((50, 0)); pen.lineTo((50, 700)); pen.lineTo((450, 700)); pen.lineTo((450, 0)); pen.closePath()
+    box = pen.glyph()
+    glyphs = {".notdef": box, "space": TTGlyphPen(None).glyph(), **{n: box for n in names}}
+    fb.setupGlyf(glyphs)
+    fb.setupHorizontalMetrics({name: (500, 50) for name in glyphs})
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    fb.setupNameTable({"familyName": family, "styleName": style or "Regular"})
+    fb.setupOS2(sTypoAscender=800, usWinAscent=800, usWinDescent=200)
+    fb.setupPost()
+    fb.save(str(path))
+
+def _carlito_dir(tmp_path):
+    for style, name in FONT_FILE_SETS[1].items():
+        _make_font(tmp_path / name, "Carlito", style)
+    return str(tmp_path)
+
+def _summary_pdf(registry, nopol):
+    pdf = MultiSetPDF()
+    main_font = registry.install(pdf)
+    render_summary(pdf, main_font, [{"nopol": nopol, "bu": "BU", "status": "LENGKAP", "missing": "-"}])
+    return main_font, bytes(pdf.output())
+
+def test_registry_loads_once_and_reuses_subsets(tmp_path):
+    registry = FontRegistry(search_dirs=[str(tmp_path / "missing"), _carlito_dir(tmp_path)])
+
+    for _ in range(3):
+        main_font, data = _summary_pdf(registry, "B 1 XY")
+        assert main_font == "Calibri"
+        reader = PdfReader(io.BytesIO(data))
+        fonts = reader.pages[0]["/Resources"]["/Font"]
+        assert any("Carlito" in str(f.get_object()["/BaseFont"]) for f in fonts.values())
+        assert "B 1 XY" in reader.pages[0].extract_text()
+
+    assert registry.loads == 1
+    stats = registry.stats()
+    assert stats["subset_cache_hits"] > 0
+
+    # Different characters -> different subset, still a valid document
+    _, data = _summary_pdf(registry, "Z 9 QQ")
+    assert "Z 9 QQ" in PdfReader(io.BytesIO(data)).pages[0].extract_text()
+
+def test_registry_falls_back_to_helvetica(tmp_path):
+    registry = FontRegistry(search_dirs=[str(tmp_path)])
+    main_font, data = _summary_pdf(registry, "B 1 XY")
+    assert main_font == "Helvetica"
+    assert data.startswith(b"%PDF")
+
+def test_registry_falls_back_to_add_font_when_sharing_fails(tmp_path, monkeypatch):
+    import font_registry
+
+    def broken_subset_map(font):
+        raise AttributeError("fpdf2 internals changed")
+
+    monkeypatch.setattr(font_registry, "SubsetMap", broken_subset_map)
+    registry = FontRegistry(search_dirs=[_carlito_dir(tmp_path)])
+
+    for _ in range(2):
+        main_font, data = _summary_pdf(registry, "B 2 FB")
+        assert main_font == "Calibri"
+        reader = PdfReader(io.BytesIO(data))
+        fonts = reader.pages[0]["/Resources"]["/Font"]
+        assert any("Carlito" in str(f.get_object()["/BaseFont"]) for f in fonts.values())
+        assert "B 2 FB" in reader.pages[0].extract_text()
+    assert registry.shared_failed
@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+import requests
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_generator
+from pdf_generator import _download_drive_file, fetch_drive_image_async
+from http_client import get_session
+from stub_drive import StubDriveServer
+
+N_IMAGES = 8  # one unit worth of images
+
+def _fetch_all(server, session_factory):
+    start = time.perf_counter()
+    for _ in range(N_IMAGES):
+        file_id = uuid.uuid4().hex
+        data = _download_drive_file(f"https://drive.google.com/file/d/{file_id}/view", file_id, session=session_factory())
+        assert data
+    return (time.perf_counter() - start) / N_IMAGES
+
+def test_pooled_session_reuses_connections():
+    # Simulated TCP+TLS handshake cost per new connection
+    with StubDriveServer(handshake_delay=0.02) as server:
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            # Old behaviour: a new session per image
+            per_image_fresh = _fetch_all(server, requests.Session)
+            fresh_connections = server.connections
+
+            server.reset_counters()
+            per_image_pooled = _fetch_all(server, get_session)
+            pooled_connections = server.connections
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+    print(f"fresh: {fresh_connections} connections, {per_image_fresh * 1000:.1f} ms/image")
+    print(f"pooled: {pooled_connections} connections, {per_image_pooled * 1000:.1f} ms/image")
+
+    assert fresh_connections == N_IMAGES
+    assert pooled_connections <= 1
+    assert per_image_pooled < per_image_fresh
+
+def test_async_fetch_uses_stub_server():
+    with StubDriveServer(thumbnail_ok=False) as server:
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            file_id = uuid.uuid4().hex
+            image_io = asyncio.run(fetch_drive_image_async(f"https://drive.google.com/open?id={file_id}"))
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+    assert image_io is not None
+    assert image_io.getvalue()[:2] == b"\xff\xd8"
+    # Thumbnail failed, fallback download was used
+    assert server.requests == 2
@@ -0,0 +1,72 @@
+import os
+import sys
+import io
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+import pdf_generator
+from image_resample import downsample_to_box, target_pixels
+from asset_store import save_asset
+from stub_drive import make_jpeg
+
+def _noisy_jpeg(width, height):
+    # Noise compresses badly, like a real photo
+    img = Image.effect_noise((width, height), 64).convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=95)
+    return buf.getvalue()
+
+def test_large_image_is_resampled_to_box():
+    data = _noisy_jpeg(3000, 2000)
+    out, w, h, before, after = downsample_to_box(io.BytesIO(data), 90, 80, dpi=150, quality=80)
+
+    max_w, max_h = target_pixels(90, 80, 150)
+    assert w <= max_w and h <= max_h
+    assert after < before
+    with Image.open(out) as img:
+        assert img.size == (w, h)
+
+def test_small_image_is_untouched():
+    data = make_jpeg(100, 80)
+    source = io.BytesIO(data)
+    out, w, h, before, after = downsample_to_box(source, 90, 80, dpi=150)
+    assert out is source
+    assert (w, h) == (100, 80)
+    assert before == after
+
+def test_pdf_reports_bytes_saved(tmp_path):
+    photo = save_asset(_noisy_jpeg(2400, 1800))
+    units = [{"nopol": "B 1 TEST", "bu": "BU", "lokasi": "LOC", "images": {"front": photo}}]
+
+    old_dpi = pdf_generator.PDF_IMAGE_DPI
+    try:
+        pdf_generator.PDF_IMAGE_DPI = 0
+        full_path, full_stats = pdf_generator.create_multiset_pdf(units, str(tmp_path / "full.pdf"), return_stats=True)
+        pdf_generator.PDF_IMAGE_DPI = 150
+        small_path, small_stats = pdf_generator.create_multiset_pdf(units, str(tmp_path / "small.pdf"), return_stats=True)
+    finally:
+        pdf_generator.PDF_IMAGE_DPI = old_dpi
+
+    assert full_stats["image_bytes_saved"] == 0
+    assert small_stats["image_bytes_saved"] > 0
+    assert os.path.getsize(small_path) < os.path.getsize(full_path)
+
+def test_docx_pictures_are_resampled(tmp_path):
+    import docx_generator
+
+    photo = save_asset(_noisy_jpeg(2400, 1800))
+    data = {"units": [{"nopol": "B 1 TEST", "bu": "BU", "lokasi": "LOC", "images": {"front": photo, "stnk": photo}}]}
+
+    old_dpi = docx_generator.DOCX_IMAGE_DPI
+    try:
+        docx_generator.DOCX_IMAGE_DPI = 0
+        full_path = docx_generator.create_multiset_docx(data, str(tmp_path / "full.docx"))
+        docx_generator.DOCX_IMAGE_DPI = 150
+        small_path = docx_generator.create_multiset_docx(data, str(tmp_path / "small.docx"))
+    finally:
+        docx_generator.DOCX_IMAGE_DPI = old_dpi
+
+    assert os.path.getsize(small_path) < os.path.getsize(full_path) / 2
@@ -0,0 +1,143 @@
+import os
+import sys
+import uuid
+import base64
+import asyncio
+from contextlib import contextmanager
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_generator
+from image_sources import resolver, ImageResolver, LocalDirSource, DataUrlSource, HttpSource
+from asset_store import save_asset
+from stub_drive import StubDriveServer, make_jpeg
+from fastapi.testclient import TestClient
+from main import app
+
+client = TestClient(app)
+
+
+@contextmanager
+def allowed_http_hosts(*hosts):
+    # The stub server is on 127.0.0.1, which is (rightly) not allowed by default
+    http = next(source for source in resolver.sources if source.name == "http")
+    old = http.allowed_hosts
+    http.allowed_hosts = set(hosts)
+    try:
+        yield
+    finally:
+        http.allowed_hosts = old
+
+
+def test_local_dir_source(tmp_path):
+    data = make_jpeg(32, 24)
+    (tmp_path / "unit1").mkdir()
+    (tmp_path / "unit1" / "front.jpg").write_bytes(data)
+    source = LocalDirSource({"nas": str(tmp_path)})
+
+    assert source.fetch("local://nas/unit1/front.jpg").getvalue() == data
+    probe = source.probe("local://nas/unit1/front.jpg")
+    assert probe["exists"] and probe["bytes"] == len(data)
+    assert (probe["width"], probe["height"]) == (32, 24)
+
+    # Unknown directory names and paths outside the directory are not served
+    assert source.fetch("local://other/unit1/front.jpg") is None
+    assert source.fetch("local://nas/../" + os.path.basename(tmp_path) + "_x/front.jpg") is None
+    assert source.fetch("local://nas/../../etc/passwd") is None
+    assert not source.probe("local://nas/unit1/missing.jpg")["exists"]
+
+
+def test_bare_paths_and_unlisted_hosts_are_not_resolved(tmp_path):
+    path = tmp_path / "secret.jpg"
+    path.write_bytes(make_jpeg())
+    for ref in (str(path), "/etc/passwd", "http://127.0.0.1:1/uc?id=x", "https://internal.example/a.jpg"):
+        assert resolver.source_for(ref) is None
+        assert resolver.fetch(ref) is None
+        assert resolver.probe(ref) == {"exists": False, "source": None}
+
+    with StubDriveServer() as server:
+        server.add_image("internal-secret", make_jpeg())
+        response = client.get("/proxy-image", params={"url": f"{server.url}/uc?id=internal-secret"})
+        assert response.status_code != 200
+        assert server.requests == 0
+
+
+def test_data_url_probe_without_decoding():
+    data = make_jpeg()
+    url = "data:image/jpeg;base64," + base64.b64encode(data).decode("ascii")
+    probe = resolver.probe(url)
+    assert probe == {"exists": True, "bytes": len(data), "content_type": "image/jpeg", "source": "dataurl"}
+    assert resolver.fetch(url).getvalue() == data
+
+
+def test_asset_source():
+    data = make_jpeg(color=(10, 200, 10))
+    asset_id = save_asset(data)
+    assert resolver.source_for(asset_id).name == "asset"
+    assert resolver.fetch(asset_id).getvalue() == data
+    assert resolver.probe(asset_id)["bytes"] == len(data)
+
+
+def test_http_and_drive_probe_use_head():
+    with StubDriveServer() as server, allowed_http_hosts("127.0.0.1"):
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            image = make_jpeg(40, 30)
+            server.add_image("plain", image)
+            http_url = f"{server.url}/uc?export=download&id=plain"
+            drive_url = f"https://drive.google.com/file/d/{uuid.uuid4().hex}/view"
+
+            probes = resolver.probe_many([http_url, drive_url, "no-such-file.jpg"])
+            assert [p["source"] for p in probes] == ["http", "drive", None]
+            assert probes[0]["exists"] and probes[0]["bytes"] == len(image)
+            assert probes[1]["exists"]
+            assert not probes[2]["exists"]
+            # HEAD requests only, nothing was downloaded
+            assert server.requests == 0
+
+            assert resolver.fetch(http_url).getvalue() == image
+            assert asyncio.run(resolver.fetch_async(http_url, remote_only=True)).getvalue() == image
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+
+def test_fetch_many_keeps_order(tmp_path):
+    images = [make_jpeg(color=(i * 40, 0, 0)) for i in range(4)]
+    paths = []
+    for i, data in enumerate(images):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(data)
+        paths.append(str(path))
+    url = "data:image/jpeg;base64," + base64.b64encode(images[0]).decode("ascii")
+
+    local = ImageResolver([DataUrlSource(), LocalDirSource({"d": str(tmp_path)})])
+    refs = [f"local://d/{os.path.basename(p)}" for p in paths]
+    results = local.fetch_many([refs[3], url, "local://d/missing.jpg", refs[1]])
+    assert results[0].getvalue() == images[3]
+    assert results[1].getvalue() == images[0]
+    assert results[2] is None
+    assert results[3].getvalue() == images[1]
+
+
+def test_custom_resolver_and_remote_only(tmp_path):
+    path = tmp_path / "a.jpg"
+    path.write_bytes(make_jpeg())
+    custom = ImageResolver([DataUrlSource(), HttpSource(), LocalDirSource({"d": str(tmp_path)})])
+    assert custom.fetch("local://d/a.jpg") is not None
+    # Local files are never handed out through the proxy
+    assert asyncio.run(custom.fetch_async("local://d/a.jpg", remote_only=True)) is None
+
+
+def test_pdf_with_http_image(tmp_path):
+    with StubDriveServer() as server, allowed_http_hosts("127.0.0.1"):
+        server.add_image("front", make_jpeg(80, 60))
+        units = [{
+            "nopol": "B 1 HTTP",
+            "images": {"front": f"{server.url}/uc?export=download&id=front", "back": "local://none/x.jpg"},
+        }]
+        output = str(tmp_path / "http.pdf")
+        pdf_generator.create_multiset_pdf(units, output)
+        assert os.path.getsize(output) > 0
+        assert server.requests == 1
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add current directory to path so we can import inference
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from inference import BatchScheduler
+
+CALL_OVERHEAD = 0.05  # fixed cost per model call, like YOLO setup/preprocess
+
+def fake_model(inputs):
+    time.sleep(CALL_OVERHEAD)
+    return [x * 2 for x in inputs]
+
+def test_concurrent_requests_are_batched():
+    scheduler = BatchScheduler(fake_model, max_batch_size=8, max_wait_ms=20)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(scheduler.predict, range(8)))
+    elapsed = time.perf_counter() - start
+
+    # Each caller gets its own result back
+    assert results == [x * 2 for x in range(8)]
+    assert scheduler.batches < 8
+    # One call per request would cost 8 * CALL_OVERHEAD
+    assert elapsed < 8 * CALL_OVERHEAD / 2
+
+def test_batch_errors_reach_every_caller():
+    def broken(inputs):
+        raise RuntimeError("model failed")
+
+    scheduler = BatchScheduler(broken, max_batch_size=4, max_wait_ms=1)
+    try:
+        scheduler.predict(1, timeout=5)
+        assert False, "expected an error"
+    except RuntimeError as e:
+        assert "model failed" in str(e)
+
+def test_short_result_list_fails_every_caller():
+    def drops_last(inputs):
+        time.sleep(0.02)
+        return [x * 2 for x in inputs[:-1]]
+
+    scheduler = BatchScheduler(drops_last, max_batch_size=4, max_wait_ms=50)
+    futures = [scheduler.submit(x) for x in range(4)]
+    for future in futures:
+        # Resolved (not left hanging) and none of them got a shifted result
+        assert isinstance(future.exception(timeout=5), RuntimeError)
+
+def test_cancelled_future_does_not_block_the_batch():
+    scheduler = BatchScheduler(fake_model, max_batch_size=4, max_wait_ms=50)
+    futures = [scheduler.submit(x) for x in range(3)]
+    futures[0].cancel()
+    assert [f.result(timeout=5) for f in futures[1:]] == [2, 4]
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import json
+import threading
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+from main import app
+from jobs import JobManager, DONE, CANCELLED
+from asset_store import save_asset
+from stub_drive import make_jpeg
+
+client = TestClient(app)
+
+def _payload(count):
+    photo = save_asset(make_jpeg(320, 240))
+    return {
+        "units": [
+            {"nopol": f"B {i} JOB", "bu": "BU", "lokasi": "JKT", "images": {"front": photo, "stnk": photo}}
+            for i in range(count)
+        ]
+    }
+
+def _wait(job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = client.get(f"/jobs/{job_id}").json()
+        if status["status"] in ("done", "failed", "cancelled"):
+            return status
+        time.sleep(0.1)
+    raise AssertionError("job did not finish")
+
+def test_pdf_job_progress_and_download():
+    response = client.post("/jobs?format=pdf", json=_payload(3))
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    status = _wait(job_id)
+    assert status["status"] == "done"
+    assert status["units_rendered"] == 3
+    assert status["images_fetched"] == 6
+    assert status["images_cropped"] == 3
+
+    download = client.get(f"/jobs/{job_id}/download")
+    assert download.status_code == 200
+    assert download.content.startswith(b"%PDF")
+
+    # Finished job: the event stream replays everything and ends
+    events = client.get(f"/jobs/{job_id}/events")
+    assert events.headers["content-type"].startswith("text/event-stream")
+    data = [json.loads(line[6:]) for line in events.text.splitlines() if line.startswith("data: ")]
+    renders = [e["unit"] for e in data if e.get("stage") == "render"]
+    assert renders == [0, 1, 2]
+    assert data[-1] == {**data[-1], "type": "status", "status": "done"}
+
+def test_docx_job():
+    job_id = client.post("/jobs?format=docx", json=_payload(2)).json()["job_id"]
+    status = _wait(job_id)
+    assert status["status"] == "done"
+    assert status["units_rendered"] == 2
+
+    download = client.get(f"/jobs/{job_id}/download")
+    assert download.status_code == 200
+    assert download.headers["content-type"].startswith("application/vnd.openxmlformats")
+
+def test_unknown_job_and_format():
+    assert client.get("/jobs/nope").status_code == 404
+    assert client.post("/jobs?format=xls", json=_payload(1)).status_code == 400
+
+def test_cancel_running_job(tmp_path):
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    output = tmp_path / "out.bin"
+
+    def body(units, path, progress=None):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        for i in range(units):
+            started.set()
+            release.wait(5)
+            progress("render", i)
+
+    job = manager.submit("test", body, (5, str(output)), 5, str(output), "application/octet-stream", "out.bin")
+    started.wait(5)
+    manager.cancel(job.id)
+    release.set()
+    job.future.result(5)
+
+    assert job.status == CANCELLED
+    assert not output.exists()
+
+def test_cancel_queued_job():
+    manager = JobManager(max_workers=1)
+    release = threading.Event()
+
+    def body(path, progress=None):
+        release.wait(5)
+
+    first = manager.submit("test", body, (None,), 1, None, "", "")
+    second = manager.submit("test", body, (None,), 1, None, "", "")
+    manager.cancel(second.id)
+    release.set()
+    first.future.result(5)
+
+    assert first.status == DONE
+    assert second.status == CANCELLED
+
+def test_retention_without_new_submissions(tmp_path, monkeypatch):
+    import scratch
+
+    manager = JobManager(max_workers=1, retention_seconds=0)
+
+    def body(path, progress=None):
+        with open(path, "wb") as f:
+            f.write(b"report")
+
+    outputs = [tmp_path / "a.pdf", tmp_path / "b.pdf"]
+    jobs = [manager.submit("test", body, (str(path),), 1, str(path), "", "") for path in outputs]
+    for job in jobs:
+        job.future.result(5)
+    time.sleep(0.01)
+
+    # One sweeper pass with the job hook registered: expired jobs and files are gone
+    monkeypatch.setattr(scratch, "SCRATCH_DIR", str(tmp_path / "scratch"))
+    monkeypatch.setattr(scratch, "_hooks", [])
+    monkeypatch.setattr(scratch, "_stop", threading.Event())
+    scratch._stop.set()
+    scratch.add_sweep_hook(manager.purge)
+    scratch._run_sweeper(0)
+
+    assert manager.stats()[DONE] == 0
+    assert not any(path.exists() for path in outputs)
+
+    # get() never hands out a job past its retention
+    late = manager.submit("test", body, (str(outputs[0]),), 1, str(outputs[0]), "", "")
+    late.future.result(5)
+    time.sleep(0.01)
+    assert manager.get(late.id) is None
+    assert not outputs[0].exists()
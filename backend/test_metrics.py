@@ -0,0 +1,91 @@
+import os
+import sys
+import uuid
+import base64
+from fastapi.testclient import TestClient
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+import pdf_generator
+from main import app
+from stub_drive import StubDriveServer, make_jpeg
+
+client = TestClient(app)
+
+
+def test_histogram_text_format():
+    hist = metrics.Histogram("test_latency_seconds", "Test histogram.", ["stage"], buckets=(0.1, 1))
+    try:
+        hist.observe(0.05, stage="a")
+        hist.observe(0.5, stage="a")
+        hist.observe(5, stage="a")
+        lines = hist.render()
+    finally:
+        metrics._registry.remove(hist)
+
+    assert lines[:2] == ["# HELP test_latency_seconds Test histogram.", "# TYPE test_latency_seconds histogram"]
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_sum{stage="a"} 5.55' in lines
+    assert 'test_latency_seconds_count{stage="a"} 3' in lines
+
+
+def test_drive_thumbnail_and_fallback_counted():
+    with StubDriveServer(thumbnail_ok=False) as server:
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            thumb_before = metrics.DRIVE_FETCHES.value(path="thumbnail", outcome="error")
+            fallback_before = metrics.DRIVE_FETCHES.value(path="fallback", outcome="ok")
+            bytes_before = metrics.DRIVE_BYTES.value(path="fallback")
+            data = pdf_generator.fetch_drive_image(f"https://drive.google.com/file/d/{uuid.uuid4().hex}/view")
+            assert data is not None
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+    assert metrics.DRIVE_FETCHES.value(path="thumbnail", outcome="error") == thumb_before + 1
+    assert metrics.DRIVE_FETCHES.value(path="fallback", outcome="ok") == fallback_before + 1
+    assert metrics.DRIVE_BYTES.value(path="fallback") == bytes_before + data.getbuffer().nbytes
+
+
+def test_metrics_endpoint_after_report():
+    image = "data:image/jpeg;base64," + base64.b64encode(make_jpeg()).decode("ascii")
+    reports_before = metrics.REPORT_BYTES.count(format="pdf")
+    response = client.post("/generate-multiset", json={
+        "units": [{"nopol": "B 1 MET", "bu": "BU", "lokasi": "LOC", "images": {"front": image}}],
+    })
+    assert response.status_code == 200
+    assert metrics.REPORT_BYTES.count(format="pdf") == reports_before + 1
+    assert metrics.UNIT_RENDER_SECONDS.count(format="pdf") >= 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE report_output_bytes histogram" in text
+    assert 'report_unit_render_seconds_count{format="pdf"}' in text
+    # The /metrics request itself is in flight while it renders
+    assert "http_requests_in_flight 1" in text
+    assert 'http_request_duration_seconds_count{method="POST",route="/generate-multiset",status="200"}' in text
+
+
+def test_streamed_report_duration_is_plausible():
+    import time
+    from pdf_stream import stream_multiset_pdf
+
+    units = [{"nopol": f"B {i} STR", "bu": "BU", "lokasi": "LOC", "images": {}} for i in range(25)]
+    seconds_before = metrics.REPORT_SECONDS.sum(format="pdf")
+    bytes_before = metrics.REPORT_BYTES.sum(format="pdf")
+    count_before = metrics.REPORT_SECONDS.count(format="pdf")
+
+    start = time.perf_counter()
+    size = sum(len(part) for part in stream_multiset_pdf(units, chunk_units=10))
+    elapsed = time.perf_counter() - start
+
+    # The chunk loop used to overwrite the timer, recording hours for a sub-second report
+    assert metrics.REPORT_SECONDS.count(format="pdf") == count_before + 1
+    assert 0 < metrics.REPORT_SECONDS.sum(format="pdf") - seconds_before <= elapsed
+    assert metrics.REPORT_BYTES.sum(format="pdf") - bytes_before == size
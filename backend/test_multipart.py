@@ -0,0 +1,90 @@
+import os
+import sys
+import io
+import json
+import hashlib
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from pypdf import PdfReader
+
+from main import app
+from asset_store import has_asset
+from stub_drive import make_jpeg
+
+client = TestClient(app)
+
+PHOTO = make_jpeg(320, 240, color=(10, 120, 200))
+
+def _manifest(count):
+    return {
+        "units": [
+            {
+                "nopol": f"B {i} MP",
+                "bu": "BU",
+                "lokasi": "JKT",
+                "images": {"front": f"file:u{i}_front", "stnk": f"file:u{i}_stnk"},
+            }
+            for i in range(count)
+        ]
+    }
+
+def _files(count):
+    files = []
+    for i in range(count):
+        files.append((f"u{i}_front", (f"front{i}.jpg", PHOTO, "image/jpeg")))
+        files.append((f"u{i}_stnk", (f"stnk{i}.jpg", PHOTO, "image/jpeg")))
+    return files
+
+def test_multipart_pdf():
+    response = client.post(
+        "/generate-multiset",
+        data={"manifest": json.dumps(_manifest(2))},
+        files=_files(2),
+    )
+    assert response.status_code == 200
+    reader = PdfReader(io.BytesIO(response.content))
+    assert len(reader.pages) == 5
+    # File parts went straight into the asset store
+    assert has_asset(hashlib.sha256(PHOTO).hexdigest())
+
+def test_multipart_docx():
+    response = client.post(
+        "/generate-multiset-docx",
+        data={"manifest": json.dumps(_manifest(1))},
+        files=_files(1),
+    )
+    assert response.status_code == 200
+    assert response.content[:2] == b"PK"
+
+def test_multipart_missing_part():
+    response = client.post(
+        "/generate-multiset",
+        data={"manifest": json.dumps(_manifest(2))},
+        files=_files(1),
+    )
+    assert response.status_code == 400
+    assert "u1_front" in response.json()["detail"]
+
+def test_multipart_missing_manifest():
+    response = client.post("/generate-multiset", files=_files(1))
+    assert response.status_code == 400
+
+def test_multipart_manifest_with_wrong_shape():
+    manifests = [
+        [],
+        "units",
+        {"units": {"nopol": "B 1"}},
+        {"units": ["B 1"]},
+        {"units": [{"nopol": "B 1", "bu": "BU", "lokasi": "LOC", "images": ["file:u0_front"]}]},
+    ]
+    for manifest in manifests:
+        response = client.post("/generate-multiset", data={"manifest": json.dumps(manifest)}, files=_files(1))
+        assert response.status_code == 400, manifest
+        assert response.json()["detail"].startswith("Invalid manifest")
+
+def test_json_validation_error():
+    response = client.post("/generate-multiset", json={"units": [{"nopol": "B 1"}]})
+    assert response.status_code == 422
@@ -0,0 +1,83 @@
+import os
+import sys
+import io
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+from pypdf import PdfReader
+
+from main import app
+from pdf_stream import stream_multiset_pdf
+from asset_store import save_asset
+from stub_drive import make_jpeg
+
+client = TestClient(app)
+
+def _units(tmp_path, count):
+    photo = save_asset(make_jpeg(640, 480))
+    return [
+        {"nopol": f"B {i} TEST", "bu": "BU", "lokasi": "JKT", "images": {"front": photo, "stnk": photo}}
+        for i in range(count)
+    ]
+
+def test_streamed_pdf_is_valid(tmp_path):
+    units = _units(tmp_path, 5)
+    parts = list(stream_multiset_pdf(units, chunk_units=2))
+
+    # header + 3 unit chunks + summary/trailer
+    assert len(parts) == 5
+    reader = PdfReader(io.BytesIO(b"".join(parts)))
+    assert len(reader.pages) == 2 * len(units) + 1
+
+    # Page numbers continue across chunks
+    for i, page in enumerate(reader.pages):
+        assert f"Halaman {i + 1}" in page.extract_text()
+
+    assert "B 4 TEST" in reader.pages[-1].extract_text()
+
+def test_generate_multiset_stream():
+    payload = {
+        "units": [{"nopol": "B 1 TEST", "bu": "BU", "lokasi": "JKT", "images": {}}],
+    }
+    completed = client.get("/pool-stats").json()["render"]["completed"]
+    response = client.post("/generate-multiset?stream=true", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+
+    reader = PdfReader(io.BytesIO(response.content))
+    assert len(reader.pages) == 3
+    # Rendered through the bounded render pool
+    render = client.get("/pool-stats").json()["render"]
+    assert render["completed"] == completed + 1
+    assert render["in_flight"] == 0
+
+def test_sharded_pdf_matches_page_order(tmp_path):
+    from pdf_shard import create_multiset_pdf_sharded, split_shards, shutdown_shard_pool
+
+    assert [len(s) for s in split_shards(list(range(7)), 3)] == [3, 2, 2]
+    assert split_shards([], 3) == []
+
+    units = _units(tmp_path, 5)
+    output = tmp_path / "sharded.pdf"
+    try:
+        _, stats = create_multiset_pdf_sharded(units, str(output), processes=2, return_stats=True)
+    finally:
+        shutdown_shard_pool()
+
+    assert stats["shards"] == 2
+    assert stats["images"] == 10
+
+    reader = PdfReader(str(output))
+    assert len(reader.pages) == 2 * len(units) + 1
+    for i, page in enumerate(reader.pages):
+        assert f"Halaman {i + 1}" in page.extract_text()
+    # Units stay in request order across shards
+    assert "B 3 TEST" in reader.pages[6].extract_text()
+
+def test_parallel_report_without_units_has_only_the_summary_page():
+    for query in ("", "?parallel=true", "?stream=true"):
+        response = client.post(f"/generate-multiset{query}", json={"units": []})
+        assert response.status_code == 200
+        assert len(PdfReader(io.BytesIO(response.content)).pages) == 1, query
@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+import uuid
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_generator
+from pdf_generator import create_multiset_pdf
+from stub_drive import StubDriveServer
+
+def test_prefetch_overlaps_drive_fetches(tmp_path):
+    delay = 0.2
+    with StubDriveServer(response_delay=delay) as server:
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            units = []
+            for i in range(2):
+                images = {key: f"https://drive.google.com/file/d/{uuid.uuid4().hex}/view"
+                          for key in ['front', 'back', 'right', 'left']}
+                units.append({"nopol": f"B {i} TEST", "bu": "BU", "lokasi": "LOC", "images": images})
+
+            start = time.perf_counter()
+            create_multiset_pdf(units, str(tmp_path / "out.pdf"))
+            elapsed = time.perf_counter() - start
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+    # 8 fetches one after another would take 8 * delay
+    assert server.requests == 8
+    assert elapsed < 4 * delay
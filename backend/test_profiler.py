@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import base64
+import asyncio
+from fastapi.testclient import TestClient
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import profiler
+from main import app
+from stub_drive import make_jpeg
+
+client = TestClient(app)
+
+
+def busy_loop(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(1000))
+
+
+def test_sampler_collects_collapsed_stacks():
+    sampler = profiler.SamplingProfiler(interval_ms=1).start()
+    busy_loop(0.1)
+    sampler.stop()
+
+    assert sampler.samples > 0
+    text = sampler.collapsed()
+    line = next(l for l in text.splitlines() if "test_profiler:busy_loop" in l)
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0
+    assert stack.split(";")[-1] == "test_profiler:busy_loop"
+    # The sampler's own thread is never in the profile
+    assert "SamplingProfiler._run" not in text
+
+
+def test_profile_disabled_by_default():
+    old = profiler.PROFILING_ENABLED
+    profiler.PROFILING_ENABLED = False
+    try:
+        response = client.post("/generate-multiset?profile=1", json={"units": []})
+    finally:
+        profiler.PROFILING_ENABLED = old
+    assert response.status_code == 403
+
+
+def test_profiled_report_request():
+    image = "data:image/jpeg;base64," + base64.b64encode(make_jpeg(1600, 1200)).decode("ascii")
+    payload = {"units": [{"nopol": "B 1 PRF", "bu": "BU", "lokasi": "LOC", "images": {"front": image, "back": image}}]}
+
+    old = profiler.PROFILING_ENABLED, profiler.PROFILE_INTERVAL_MS
+    profiler.PROFILING_ENABLED, profiler.PROFILE_INTERVAL_MS = True, 1
+    try:
+        response = client.post("/generate-multiset", json=payload, headers={"X-Profile": "1"})
+        plain = client.post("/generate-multiset", json=payload)
+    finally:
+        profiler.PROFILING_ENABLED, profiler.PROFILE_INTERVAL_MS = old
+
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+    assert "X-Profile-Id" not in plain.headers
+
+    profile = client.get(response.headers["X-Profile-Url"])
+    assert profile.status_code == 200
+    lines = profile.text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert "pdf_generator:" in profile.text
+
+    assert client.get("/profiles/not-a-profile").status_code == 404
+
+
+def test_unprofiled_requests_pass_straight_through():
+    from main import ProfileMiddleware
+
+    calls = []
+
+    async def inner(scope, receive, send):
+        calls.append((receive, send))
+
+    async def receive():
+        pass
+
+    async def send(message):
+        pass
+
+    middleware = ProfileMiddleware(inner)
+    scopes = [
+        {"type": "http", "path": "/cache-stats", "headers": [(b"x-profile", b"1")], "query_string": b""},
+        {"type": "http", "path": "/generate-multiset", "headers": [], "query_string": b"profile=0"},
+        {"type": "lifespan"},
+    ]
+    for scope in scopes:
+        asyncio.run(middleware(scope, receive, send))
+    # The app got the original receive/send, nothing wrapped
+    assert calls == [(receive, send)] * len(scopes)
+
+
+def test_frame_name_without_qualname():
+    # Python < 3.11 code objects have no co_qualname
+    from types import SimpleNamespace
+
+    code = SimpleNamespace(co_filename="/app/pdf_generator.py", co_name="render_unit")
+    assert profiler._frame_name(code) == "pdf_generator:render_unit"
+    assert profiler._frame_name(busy_loop.__code__).startswith("test_profiler:busy_loop")
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi.testclient import TestClient
+
+import scratch
+from main import app
+
+client = TestClient(app)
+
+def _write(path, size, age, now):
+    path.write_bytes(b"x" * size)
+    os.utime(path, (now - age, now - age))
+
+def test_sweep_ttl_and_quota(tmp_path, monkeypatch):
+    monkeypatch.setattr(scratch, "SCRATCH_DIR", str(tmp_path))
+    (tmp_path / "assets").mkdir()
+    (tmp_path / "drive_cache").mkdir()
+    now = time.time()
+
+    _write(tmp_path / "old.jpg", 100, 7200, now)
+    _write(tmp_path / "assets" / "a", 100, 300, now)
+    _write(tmp_path / "assets" / "b", 100, 200, now)
+    _write(tmp_path / "c.pdf", 100, 100, now)
+    # Caches manage themselves, never swept
+    _write(tmp_path / "drive_cache" / "x", 100, 99999, now)
+
+    deleted = scratch.sweep(ttl_seconds=3600, max_bytes=250, now=now)
+
+    assert deleted == 2
+    assert not (tmp_path / "old.jpg").exists()
+    # Quota evicts the oldest remaining file first
+    assert not (tmp_path / "assets" / "a").exists()
+    assert (tmp_path / "assets" / "b").exists()
+    assert (tmp_path / "c.pdf").exists()
+    assert (tmp_path / "drive_cache" / "x").exists()
+
+    usage = scratch.disk_usage()
+    assert usage["directories"]["assets"] == {"files": 1, "bytes": 100}
+    assert usage["swept_bytes"] == 200
+    assert usage["total_bytes"] == 300
+
+def test_report_deleted_after_response():
+    before = set(os.listdir("temp_uploads"))
+    payload = {"units": [{"nopol": "B 1 TMP", "bu": "BU", "lokasi": "JKT", "images": {}}]}
+
+    response = client.post("/generate-multiset", json=payload)
+    assert response.status_code == 200
+    assert response.content.startswith(b"%PDF")
+
+    leftovers = [f for f in set(os.listdir("temp_uploads")) - before if f.endswith(".pdf")]
+    assert leftovers == []
+
+    stats = client.get("/scratch-stats").json()
+    assert stats["deleted_after_response"] >= 1
+    assert "quota_bytes" in stats
+
+def test_assets_of_pending_jobs_are_not_swept(tmp_path, monkeypatch):
+    import threading
+    import asset_store
+    import jobs
+    from main import pending_job_asset_paths
+
+    monkeypatch.setattr(scratch, "SCRATCH_DIR", str(tmp_path))
+    monkeypatch.setattr(scratch, "_keep_hooks", [])
+    monkeypatch.setattr(asset_store, "ASSET_DIR", str(tmp_path / "assets"))
+    manager = jobs.JobManager(max_workers=1)
+    monkeypatch.setattr(jobs, "job_manager", manager)
+    (tmp_path / "assets").mkdir()
+    now = time.time()
+
+    used, stale, fresh = (asset_store.save_asset(bytes([i]) * 100) for i in range(3))
+    for asset_id, age in ((used, 7200), (stale, 7200), (fresh, 10)):
+        os.utime(asset_store.asset_path(asset_id), (now - age, now - age))
+
+    release = threading.Event()
+    job = manager.submit("test", lambda path, progress=None: release.wait(5), (None,), 1, None, "", "", {used})
+    scratch.add_keep_hook(pending_job_asset_paths)
+    try:
+        # TTL removes the stale asset, the quota the fresh one; the job's photo stays
+        assert scratch.sweep(ttl_seconds=3600, max_bytes=1, now=now) == 2
+        assert os.listdir(tmp_path / "assets") == [used]
+        assert scratch.disk_usage()["kept_in_use_files"] == 1
+    finally:
+        release.set()
+    job.future.result(5)
+
+    # Finished jobs no longer hold their assets
+    assert scratch.sweep(ttl_seconds=3600, max_bytes=1, now=now) == 1
+    assert os.listdir(tmp_path / "assets") == []
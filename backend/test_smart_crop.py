@@ -0,0 +1,53 @@
+import os
+import sys
+import io
+
+# Add current directory to path so we can import smart_crop
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import cv2
+import numpy as np
+import pytest
+
+import smart_crop
+from cache import MemoryLRU, DiskCache, TieredCache
+from smart_crop import smart_doc_crop
+
+@pytest.fixture
+def doc_crop_cache(tmp_path, monkeypatch):
+    # Fresh cache per test: entries left in temp_uploads by earlier runs must not count
+    cache = TieredCache(MemoryLRU(16 * 1024 * 1024), DiskCache(str(tmp_path / "doc_crop_cache"), 64 * 1024 * 1024, 3600))
+    monkeypatch.setattr(smart_crop, "doc_crop_cache", cache)
+    return cache
+
+def _photo_of_document():
+    # Dark background with a white sheet; the noisy corner makes the bytes unique
+    img = np.full((600, 800, 3), 30, dtype=np.uint8)
+    pts = np.array([[150, 100], [650, 120], [630, 500], [170, 480]], dtype=np.int32)
+    cv2.fillPoly(img, [pts], (240, 240, 240))
+    img[:40, :40] = np.random.default_rng().integers(0, 60, (40, 40, 3), dtype=np.uint8)
+    return cv2.imencode('.png', img)[1].tobytes()
+
+def test_doc_crop_result_is_cached(doc_crop_cache):
+    data = _photo_of_document()
+    before = doc_crop_cache.stats()
+
+    first = smart_doc_crop(io.BytesIO(data))
+    second = smart_doc_crop(io.BytesIO(data))
+
+    after = doc_crop_cache.stats()
+    assert first.getvalue() == second.getvalue()
+    assert after["misses"] == before["misses"] + 1
+    assert after["memory_hits"] == before["memory_hits"] + 1
+
+def test_no_document_verdict_is_cached(doc_crop_cache):
+    blank = np.full((300, 400, 3), 128, dtype=np.uint8)
+    data = cv2.imencode('.png', blank)[1].tobytes()
+
+    original = io.BytesIO(data)
+    assert smart_doc_crop(original) is original
+
+    hits = doc_crop_cache.stats()["memory_hits"]
+    again = io.BytesIO(data)
+    assert smart_doc_crop(again) is again
+    assert doc_crop_cache.stats()["memory_hits"] == hits + 1
@@ -0,0 +1,23 @@
+import os
+import sys
+import time
+from fastapi.testclient import TestClient
+
+# Add current directory to path so we can import main
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import main
+from main import app
+
+def test_liveness_and_readiness():
+    # Entering the client runs the startup hook, which loads the model in the background
+    with TestClient(app) as client:
+        root = client.get("/").json()
+        assert root["live"] is True
+
+        deadline = time.time() + 120
+        while not client.get("/").json()["ready"] and time.time() < deadline:
+            time.sleep(0.2)
+
+        assert client.get("/ready").status_code == 200
+        assert main.model is not None
@@ -0,0 +1,91 @@
+import os
+import sys
+import uuid
+import base64
+from fastapi.testclient import TestClient
+
+# Add current directory to path so we can import the backend modules
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pdf_generator
+from main import app
+from asset_store import save_asset
+from stub_drive import StubDriveServer, make_jpeg
+
+client = TestClient(app)
+
+ALL_KEYS = ["stnk", "tax", "kir", "kir_card", "front", "back", "right", "left"]
+
+
+def drive_url(file_id):
+    return f"https://drive.google.com/file/d/{file_id}/view"
+
+
+def test_validate_without_downloading():
+    data_url = "data:image/jpeg;base64," + base64.b64encode(make_jpeg()).decode("ascii")
+    asset_id = save_asset(make_jpeg(color=(1, 2, 3)))
+
+    with StubDriveServer() as server:
+        # Only explicitly added IDs exist
+        server.httpd.default_image = None
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            present = uuid.uuid4().hex
+            server.add_image(present, make_jpeg())
+            complete = {key: drive_url(present) for key in ALL_KEYS}
+            complete["stnk"] = data_url
+            complete["tax"] = asset_id
+            incomplete = {"front": drive_url(present), "back": drive_url(uuid.uuid4().hex), "stnk": data_url}
+
+            response = client.post("/validate", json={"units": [
+                {"nopol": "B 1 OK", "bu": "BU", "lokasi": "LOC", "images": complete},
+                {"nopol": "B 2 KRG", "bu": "BU", "lokasi": "LOC", "images": incomplete},
+            ]})
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+    assert response.status_code == 200
+    body = response.json()
+    ok, partial = body["units"]
+    assert ok["status"] == "LENGKAP" and ok["missing"] == "-"
+    assert ok["images"]["tax"]["source"] == "asset"
+    assert partial["status"] == "KURANG (6)"
+    assert partial["missing"] == "TAX, KIR, KIR_CARD, BACK, RIGHT, LEFT"
+    assert partial["images"]["back"] == {"exists": False, "bytes": None, "content_type": "text/html", "source": "drive"}
+    assert (body["complete"], body["incomplete"]) == (1, 1)
+    # HEAD probes only, no image was downloaded
+    assert server.requests == 0
+
+
+def test_summary_counts_drawn_drive_images():
+    # The summary used os.path.exists(), so Drive links were always reported missing
+    with StubDriveServer() as server:
+        old_base = pdf_generator.DRIVE_BASE_URL
+        pdf_generator.DRIVE_BASE_URL = server.url
+        try:
+            unit = {"nopol": "B 3 DRV", "images": {key: drive_url(uuid.uuid4().hex) for key in ALL_KEYS}}
+            unit["images"]["left"] = "missing/left.jpg"
+            pdf, main_font = pdf_generator.new_multiset_pdf()
+            layout, boxes = pdf_generator.resolve_layout()
+            prepared = next(pdf_generator.prefetch_unit_images([unit], boxes=boxes))
+            row = pdf_generator.render_unit(pdf, main_font, unit, prepared, layout)
+        finally:
+            pdf_generator.DRIVE_BASE_URL = old_base
+
+    assert row["status"] == "KURANG (1)"
+    assert row["missing"] == "LEFT"
+
+
+def test_validate_does_not_probe_server_paths_or_other_hosts():
+    with StubDriveServer() as server:
+        response = client.post("/validate", json={"units": [{
+            "nopol": "B 4 SEC", "bu": "BU", "lokasi": "LOC",
+            "images": {"stnk": "/etc/shadow", "front": f"{server.url}/uc?id=internal", "back": "local://nope/a.jpg"},
+        }]})
+        assert server.connections == 0
+
+    assert response.status_code == 200
+    images = response.json()["units"][0]["images"]
+    for key in ("stnk", "front", "back"):
+        assert images[key] == {"exists": False, "source": None, "error": "unsupported reference"}